@@ -0,0 +1,72 @@
+import sys
+import timeit
+import tracemalloc
+
+from common import read
+from tenki_no_ko import parsing
+
+PAGES = [
+    ('index.html', parsing.parse_regions),
+    ('prefecture.html', parsing.parse_prefectures),
+    ('subprefecture.html', parsing.parse_subprefectures_and_cities),
+    ('forecast_summary.html', parsing.parse_forecast_summary),
+    ('3_hourly_forecast.html', parsing.parse_3_hourly_forecasts),
+]
+
+
+def _measure(content, parser, parse_only, repeat):
+    seconds = min(timeit.repeat(
+        lambda: parsing.make_soup(content, parser, parse_only),
+        number=1,
+        repeat=repeat
+    ))
+
+    tracemalloc.start()
+    soup = parsing.make_soup(content, parser, parse_only)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del soup
+
+    return seconds, peak
+
+
+def main(repeat=5):
+    parsers = [
+        parser
+        for parser in ('html.parser', 'lxml')
+        if parsing.resolve_parser(parser) == parser
+    ]
+    row = '{:<24}{:<13}{:>10}{:>10}{:>8}{:>11}{:>11}{:>8}'
+
+    print(row.format(
+        'page', 'parser',
+        'full ms', 'part ms', 'time',
+        'full KiB', 'part KiB', 'memory',
+    ))
+
+    for filename, parse in PAGES:
+        content = read(filename)
+
+        for parser in parsers:
+            full_time, full_peak = _measure(content, parser, None, repeat)
+            part_time, part_peak = _measure(
+                content,
+                parser,
+                parse.parse_only,
+                repeat
+            )
+
+            print(row.format(
+                filename,
+                parser,
+                '{:.1f}'.format(full_time * 1000),
+                '{:.1f}'.format(part_time * 1000),
+                '{:.0%}'.format(part_time / full_time),
+                full_peak // 1024,
+                part_peak // 1024,
+                '{:.0%}'.format(part_peak / full_peak),
+            ))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,70 @@
+import concurrent.futures
+import os
+import sys
+import time
+
+from common import BASE_URL
+from common import MemoryTransport
+from tenki_no_ko import WeatherScraper
+
+
+def _locations(count):
+    return [
+        {
+            'region_id': '3',
+            'prefecture_id': '16',
+            'subprefecture_id': '4410',
+            'city_id': str(13101 + index),
+        }
+        for index in range(count)
+    ]
+
+
+def _throughput(executor, max_workers, count):
+    weather_scraper = WeatherScraper(
+        transport=MemoryTransport({
+            '/forecast/3/16/4410/{}/3hours.html'.format(13101 + index): (
+                '3_hourly_forecast.html'
+            )
+            for index in range(count)
+        }),
+        base_url=BASE_URL,
+        executor=executor
+    )
+    # Warm up, which also starts every worker process
+    weather_scraper.extract_3_hourly_forecasts_batch(
+        _locations(max_workers),
+        max_workers=max_workers
+    )
+
+    started = time.perf_counter()
+    weather_scraper.extract_3_hourly_forecasts_batch(
+        _locations(count),
+        max_workers=max_workers
+    )
+
+    return count / (time.perf_counter() - started)
+
+
+def main(count=200, max_processes=None):
+    max_processes = max_processes or os.cpu_count()
+    row = '{:<20}{:>10}{:>10}'
+
+    print(row.format('parse stage', 'pages/s', 'speedup'))
+
+    threads = _throughput(None, 8, count)
+    print(row.format('threads only', '{:.1f}'.format(threads), '1.00'))
+
+    for processes in range(1, max_processes + 1):
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            pages = _throughput(executor, processes * 2, count)
+
+        print(row.format(
+            '{} process(es)'.format(processes),
+            '{:.1f}'.format(pages),
+            '{:.2f}'.format(pages / threads),
+        ))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
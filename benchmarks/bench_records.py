@@ -0,0 +1,65 @@
+import datetime
+import json
+import sys
+import tracemalloc
+
+from common import read
+from tenki_no_ko import ForecastSummary
+from tenki_no_ko import ThreeHourlyForecasts
+from tenki_no_ko import parsing
+from tenki_no_ko.cache import JST
+
+NOW = datetime.datetime(2020, 8, 20, 9, 0, tzinfo=JST)
+
+
+def _outputs(count):
+    summary = parsing.parse_content(
+        read('forecast_summary.html'),
+        parsing.parse_forecast_summary
+    )
+    three_hourly = parsing.parse_content(
+        read('3_hourly_forecast.html'),
+        parsing.parse_3_hourly_forecasts,
+        extra_rows=parsing.THREE_HOURLY_EXTRA_ROWS
+    )
+    text = json.dumps([summary, three_hourly])
+
+    # Every city gets its own strings, as if each had been scraped
+    for _ in range(count):
+        yield json.loads(text)
+
+
+def _retained(build, count):
+    tracemalloc.start()
+    kept = [build(summary, three_hourly) for summary, three_hourly in (
+        _outputs(count)
+    )]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return size / count
+
+
+def main(count=1000):
+    row = '{:<28}{:>12}'
+    dicts = _retained(
+        lambda summary, three_hourly: (summary, three_hourly),
+        count
+    )
+    records = _retained(
+        lambda summary, three_hourly: (
+            ForecastSummary.from_dict(summary, now=NOW),
+            ThreeHourlyForecasts.from_dict(three_hourly),
+        ),
+        count
+    )
+
+    print(row.format('summary + 3-hourly', 'bytes/city'))
+    print(row.format('dicts of strings', '{:.0f}'.format(dicts)))
+    print(row.format('records', '{:.0f}'.format(records)))
+    print(row.format('saved', '{:.0%}'.format(1 - records / dicts)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
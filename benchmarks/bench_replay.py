@@ -0,0 +1,73 @@
+import sys
+import tempfile
+import time
+
+from common import BASE_URL
+from common import read
+from tenki_no_ko import PageArchive
+from tenki_no_ko import ReplayTransport
+from tenki_no_ko import WeatherScraper
+
+
+def _locations(count):
+    return [
+        {
+            'region_id': '3',
+            'prefecture_id': '16',
+            'subprefecture_id': '4410',
+            'city_id': str(13101 + index),
+        }
+        for index in range(count)
+    ]
+
+
+def main(count=1000):
+    content = read('forecast_summary.html')
+    row = '{:<24}{:>10}'
+
+    with tempfile.TemporaryDirectory() as directory:
+        with PageArchive(directory) as archive:
+            started = time.perf_counter()
+
+            for location_ids in _locations(count):
+                archive.append(
+                    '{}/forecast/3/16/4410/{}/'.format(
+                        BASE_URL,
+                        location_ids['city_id']
+                    ),
+                    content
+                )
+
+            recorded = time.perf_counter() - started
+
+        # Replaying reopens the archive, as a later run would
+        with PageArchive(directory) as archive:
+            transport = ReplayTransport(archive)
+            urls = archive.urls()
+
+            started = time.perf_counter()
+
+            for url in urls:
+                transport.get(url)
+
+            loaded = time.perf_counter() - started
+
+            weather_scraper = WeatherScraper(
+                transport=transport,
+                base_url=BASE_URL
+            )
+            started = time.perf_counter()
+
+            for location_ids in _locations(count):
+                weather_scraper.extract_forecast_summary(location_ids)
+
+            replayed = time.perf_counter() - started
+
+    print(row.format('step', 'pages/s'))
+    print(row.format('record', '{:.0f}'.format(count / recorded)))
+    print(row.format('load from archive', '{:.0f}'.format(count / loaded)))
+    print(row.format('replay and extract', '{:.0f}'.format(count / replayed)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+import bs4
+
+from common import BASE_URL
+from common import LOCATION_IDS
+from common import MemoryTransport
+from common import read
+from common import serve
+from tenki_no_ko import LocationScraper
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko import parsing
+
+BASELINE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    'baseline.json',
+)
+
+
+def _cases(parser):
+    location_scraper = LocationScraper(
+        transport=MemoryTransport(),
+        base_url=BASE_URL,
+        parser=parser
+    )
+    weather_scraper = WeatherScraper(
+        transport=MemoryTransport(),
+        base_url=BASE_URL,
+        parser=parser
+    )
+    summary = ('forecast_summary.html', parsing.parse_forecast_summary)
+    three_hourly = ('3_hourly_forecast.html', parsing.parse_3_hourly_forecasts)
+
+    # (name, [(page, extractor)] parsed by the call, call)
+    return [
+        (
+            'get_soup',
+            [('index.html', None)],
+            lambda: location_scraper.get_soup(BASE_URL),
+        ),
+        (
+            'extract_regions',
+            [('index.html', parsing.parse_regions)],
+            location_scraper.extract_regions,
+        ),
+        (
+            'extract_prefectures',
+            [('prefecture.html', parsing.parse_prefectures)],
+            lambda: location_scraper.extract_prefectures('3'),
+        ),
+        (
+            'extract_subprefectures_and_cities',
+            [('subprefecture.html', parsing.parse_subprefectures_and_cities)],
+            lambda: location_scraper.extract_subprefectures_and_cities(
+                '3',
+                '16'
+            ),
+        ),
+        (
+            'extract_forecast_summary',
+            [summary],
+            lambda: weather_scraper.extract_forecast_summary(LOCATION_IDS),
+        ),
+        (
+            'extract_3_hourly_forecasts',
+            [three_hourly],
+            lambda: weather_scraper.extract_3_hourly_forecasts(LOCATION_IDS),
+        ),
+        (
+            'extract_3_hourly_forecasts_for_next_24_hours',
+            [three_hourly],
+            lambda: (
+                weather_scraper
+                .extract_3_hourly_forecasts_for_next_24_hours(LOCATION_IDS)
+            ),
+        ),
+        (
+            'extract_city_snapshot',
+            [summary, three_hourly],
+            lambda: weather_scraper.extract_city_snapshot(LOCATION_IDS),
+        ),
+        (
+            'extract_listing_forecasts',
+            [('subprefecture.html', parsing.parse_listing_forecasts)],
+            lambda: weather_scraper.extract_listing_forecasts('3', '16'),
+        ),
+    ]
+
+
+def _seconds(function, repeat):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def _peak(function):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak
+
+
+def measure_cases(parser, repeat):
+    # parse_ms covers building the trees only, extract_ms the whole call
+    # (fetching from memory, parsing and extracting).
+    results = {}
+
+    for name, pages, call in _cases(parser):
+        contents = [
+            (read(filename), parse.parse_only if parse else None)
+            for filename, parse in pages
+        ]
+        results[name] = {
+            'parse_ms': _seconds(
+                lambda: [
+                    parsing.make_soup(content, parser, parse_only)
+                    for content, parse_only in contents
+                ],
+                repeat
+            ) * 1000,
+            'extract_ms': _seconds(call, repeat) * 1000,
+            'peak_kib': _peak(call) / 1024,
+        }
+
+    return results
+
+
+def measure_throughput(parser, latency, requests, max_workers):
+    with serve(latency) as base_url:
+        weather_scraper = WeatherScraper(base_url=base_url, parser=parser)
+        started = time.perf_counter()
+
+        for record in weather_scraper.iter_forecast_summaries(
+                [LOCATION_IDS] * requests,
+                max_workers=max_workers
+        ):
+            if record['error'] is not None:
+                raise record['error']
+
+        return requests / (time.perf_counter() - started)
+
+
+def compare(results, baseline, tolerance):
+    # Times and memory may grow, and throughput drop, by tolerance
+    # before they count as a regression.
+    regressions = []
+
+    for name, metrics in results['cases'].items():
+        for metric, value in metrics.items():
+            expected = baseline['cases'].get(name, {}).get(metric)
+
+            if expected and value > expected * (1 + tolerance):
+                regressions.append((name, metric, expected, value))
+
+    # Throughput is only comparable under the same latency and workers
+    throughput = baseline.get('throughput', {})
+    expected = throughput.get('pages_per_second')
+    value = results['throughput']['pages_per_second']
+    comparable = all(
+        throughput.get(key) == results['throughput'][key]
+        for key in ('latency', 'workers')
+    )
+
+    if comparable and expected and value < expected / (1 + tolerance):
+        regressions.append(('throughput', 'pages_per_second', expected, value))
+
+    return regressions
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(
+        description='Measure the parsing and extraction hot paths.'
+    )
+    argument_parser.add_argument('--parser', default=parsing.DEFAULT_PARSER)
+    argument_parser.add_argument('--repeat', type=int, default=5)
+    argument_parser.add_argument('--latency', type=float, default=0.05)
+    argument_parser.add_argument('--requests', type=int, default=50)
+    argument_parser.add_argument('--workers', type=int, default=8)
+    argument_parser.add_argument('--tolerance', type=float, default=0.25)
+    argument_parser.add_argument('--baseline', default=BASELINE)
+    argument_parser.add_argument(
+        '--save',
+        action='store_true',
+        help='store the results as the new baseline'
+    )
+    args = argument_parser.parse_args(argv)
+    tree_builder = parsing.resolve_parser(args.parser)
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'bs4': bs4.__version__,
+            'parser': tree_builder,
+            'machine': platform.machine(),
+        },
+        'cases': measure_cases(tree_builder, args.repeat),
+        'throughput': {
+            'latency': args.latency,
+            'workers': args.workers,
+            'pages_per_second': measure_throughput(
+                tree_builder,
+                args.latency,
+                args.requests,
+                args.workers
+            ),
+        },
+    }
+
+    row = '{:<46}{:>10}{:>12}{:>10}'
+    print(row.format('call', 'parse ms', 'extract ms', 'peak KiB'))
+
+    for name, metrics in results['cases'].items():
+        print(row.format(
+            name,
+            '{:.1f}'.format(metrics['parse_ms']),
+            '{:.1f}'.format(metrics['extract_ms']),
+            '{:.0f}'.format(metrics['peak_kib']),
+        ))
+
+    print('throughput: {:.1f} pages/s ({:.0f} ms latency, {} workers)'.format(
+        results['throughput']['pages_per_second'],
+        args.latency * 1000,
+        args.workers
+    ))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    # Timings from another parser, bs4, Python or machine would all
+    # look like regressions (or hide them)
+    environment = baseline.get('environment', {})
+    changed = sorted(
+        key for key, value in results['environment'].items()
+        if environment.get(key) != value
+    )
+
+    if changed:
+        print('baseline not compared, measured with another {}'.format(
+            ', '.join(changed)
+        ))
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    for name, metric, expected, value in regressions:
+        print('REGRESSION {} {}: {:.1f} -> {:.1f}'.format(
+            name,
+            metric,
+            expected,
+            value
+        ))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import contextlib
+import http.server
+import os
+import threading
+import time
+import types
+import urllib.parse
+
+TEST_FILES = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.pardir,
+    'tests',
+    'test_files',
+)
+# Paths of the fixture pages on tenki.jp
+PAGES = {
+    '/': 'index.html',
+    '/forecast/3/': 'prefecture.html',
+    '/forecast/3/16/': 'subprefecture.html',
+    '/forecast/3/16/4410/13101/': 'forecast_summary.html',
+    '/forecast/3/16/4410/13101/3hours.html': '3_hourly_forecast.html',
+}
+BASE_URL = 'http://tenki.invalid'
+LOCATION_IDS = {
+    'region_id': '3',
+    'prefecture_id': '16',
+    'subprefecture_id': '4410',
+    'city_id': '13101',
+}
+
+
+def read(filename):
+    with open(os.path.join(TEST_FILES, filename), 'rb') as f:
+        return f.read()
+
+
+class MemoryTransport:
+    # Answers from the fixture pages in memory, so that only parsing
+    # and extraction are measured. Unknown paths get an empty body.
+    response_cache = None
+
+    def __init__(self, pages=None):
+        self.pages = {
+            path: read(filename)
+            for path, filename in (pages or PAGES).items()
+        }
+
+    def get(self, url, **kwargs):
+        path = urllib.parse.urlsplit(url).path or '/'
+        return types.SimpleNamespace(content=self.pages.get(path, b''))
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        content = self.server.pages.get(self.path)
+
+        if content is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve(latency=0):
+    # Local stand-in for tenki.jp, answering after latency seconds
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0),
+        _RequestHandler
+    )
+    server.daemon_threads = True
+    server.latency = latency
+    server.pages = {
+        path: read(filename) for path, filename in PAGES.items()
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    finally:
+        server.shutdown()
+        server.server_close()
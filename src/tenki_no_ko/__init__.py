@@ -1,3 +1,22 @@
+from .archive import PageArchive
+from .archive import RecordingTransport
+from .archive import ReplayTransport
+from .cache import ForecastCache
+from .cache import ResponseCache
+from .catalog import CrawlError
+from .catalog import LocationCatalog
+from .coalescing import AsyncSingleFlight
+from .coalescing import SingleFlight
+from .columnar import ThreeHourlyColumns
+from .delta import ChangeTracker
+from .limiter import AdaptiveLimiter
+from .metrics import Metrics
+from .records import DailyForecast
+from .records import ForecastSummary
+from .records import ThreeHourlyForecast
+from .records import ThreeHourlyForecasts
 from .scraper import LocationScraper
 from .scraper import Scraper
 from .scraper import WeatherScraper
+from .search import CityIndex
+from .transport import Transport
@@ -0,0 +1,213 @@
+import asyncio
+import functools
+
+import aiohttp
+
+from . import parsing
+from .scraper import BASE_URL
+from .scraper import _forecast_url
+from .scraper import _next_24_hours
+from .scraper import _prefectures_url
+from .scraper import _subprefectures_url
+
+
+class AsyncScraper:
+    def __init__(
+            self,
+            session=None,
+            base_url=BASE_URL,
+            max_concurrency=100,
+            connect_timeout=3.05,
+            read_timeout=10,
+            executor=None,
+            parser=parsing.DEFAULT_PARSER
+    ):
+        self.base_url = base_url
+        self.parser = parsing.resolve_parser(parser)
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout,
+            sock_read=read_timeout
+        )
+        # Parsing is CPU bound, so it runs on the executor (the loop's
+        # default thread pool unless given, e.g. a ProcessPoolExecutor).
+        self.executor = executor
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore = None
+
+    async def get_soup(self, url, parse_only=None):
+        content = await self.fetch(url)
+
+        if content is None:
+            return None
+
+        return await self._run_in_executor(
+            parsing.make_soup,
+            content,
+            self.parser,
+            parse_only
+        )
+
+    async def fetch(self, url):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            try:
+                session = self._get_session()
+                async with session.get(url) as response:
+                    return await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return None
+
+    async def close(self):
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _scrape(self, url, parse, **kwargs):
+        content = await self.fetch(url)
+        return await self._run_in_executor(
+            parsing.parse_content,
+            content,
+            parse,
+            self.parser,
+            **kwargs
+        )
+
+    async def _run_in_executor(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(function, *args, **kwargs)
+        )
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+            )
+
+        return self._session
+
+
+class AsyncLocationScraper(AsyncScraper):
+    async def extract_regions(self):
+        return await self._scrape(self.base_url, parsing.parse_regions)
+
+    async def extract_prefectures(self, region_id):
+        return await self._scrape(
+            _prefectures_url(self.base_url, region_id),
+            parsing.parse_prefectures
+        )
+
+    async def extract_subprefectures_and_cities(
+            self,
+            region_id,
+            prefecture_id
+    ):
+        return await self._scrape(
+            _subprefectures_url(self.base_url, region_id, prefecture_id),
+            parsing.parse_subprefectures_and_cities
+        )
+
+
+class AsyncWeatherScraper(AsyncScraper):
+    def __init__(
+            self,
+            session=None,
+            base_url=BASE_URL,
+            max_concurrency=100,
+            connect_timeout=3.05,
+            read_timeout=10,
+            executor=None,
+            parser=parsing.DEFAULT_PARSER,
+            single_flight=None
+    ):
+        super().__init__(
+            session,
+            base_url,
+            max_concurrency,
+            connect_timeout,
+            read_timeout,
+            executor,
+            parser
+        )
+        self.single_flight = single_flight
+
+    async def _scrape(self, url, parse, **kwargs):
+        if self.single_flight is None:
+            return await super()._scrape(url, parse, **kwargs)
+
+        return await self.single_flight.do(
+            (url, parse.__name__, repr(sorted(kwargs.items()))),
+            super()._scrape,
+            url,
+            parse,
+            **kwargs
+        )
+
+    async def extract_forecast_summary(self, location_ids):
+        try:
+            url = _forecast_url(self.base_url, location_ids)
+        except AttributeError:
+            return parsing.parse_forecast_summary(None)
+
+        return await self._scrape(url, parsing.parse_forecast_summary)
+
+    async def extract_3_hourly_forecasts(self, location_ids, extra_rows=()):
+        # Reject unknown rows before anything is fetched
+        parsing.three_hourly_keys(extra_rows)
+
+        try:
+            url = _forecast_url(self.base_url, location_ids, '3hours.html')
+        except AttributeError:
+            return parsing.parse_3_hourly_forecasts(None, extra_rows)
+
+        return await self._scrape(
+            url,
+            parsing.parse_3_hourly_forecasts,
+            extra_rows=extra_rows
+        )
+
+    async def extract_listing_forecasts(
+            self,
+            region_id=None,
+            prefecture_id=None
+    ):
+        if region_id is None:
+            url = self.base_url
+        elif prefecture_id is None:
+            url = _prefectures_url(self.base_url, region_id)
+        else:
+            url = _subprefectures_url(self.base_url, region_id, prefecture_id)
+
+        return await self._scrape(url, parsing.parse_listing_forecasts)
+
+    async def extract_3_hourly_forecasts_for_next_24_hours(
+            self,
+            location_ids,
+            extra_rows=()
+    ):
+        raw_forecasts = await self.extract_3_hourly_forecasts(
+            location_ids,
+            extra_rows
+        )
+        return _next_24_hours(raw_forecasts)
+
+    async def extract_city_snapshot(self, location_ids, extra_rows=()):
+        snapshot, three_hourly_forecasts = await asyncio.gather(
+            self.extract_forecast_summary(location_ids),
+            self.extract_3_hourly_forecasts(location_ids, extra_rows),
+        )
+        snapshot['3_hourly_forecasts'] = three_hourly_forecasts
+
+        return snapshot
@@ -0,0 +1,231 @@
+import bisect
+import datetime
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .transport import Transport
+
+DATA_FILE = 'pages.dat'
+INDEX_FILE = 'pages.idx'
+
+
+def _timestamp(value):
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+
+    return value
+
+
+class NotArchived(requests.exceptions.RequestException):
+    pass
+
+
+class PageArchive:
+    # Append-only record of fetched pages: every body is compressed on
+    # its own into pages.dat, and pages.idx gets one JSON line with the
+    # URL, fetch time, offset and length of the body. A body is written
+    # before its index line, so a crash at worst leaves unindexed bytes
+    # behind. Bodies are read back through a read-only mmap of pages.dat.
+    def __init__(self, directory, compress_level=6):
+        self.directory = directory
+        self.compress_level = compress_level
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._mmap = None
+        os.makedirs(directory, exist_ok=True)
+        self._data = open(os.path.join(directory, DATA_FILE), 'a+b')
+        self._index = open(
+            os.path.join(directory, INDEX_FILE),
+            'a+',
+            encoding='utf-8'
+        )
+        self._load_index()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def urls(self):
+        with self._lock:
+            return sorted(self._entries)
+
+    def fetch_times(self, url):
+        with self._lock:
+            return [entry['fetched'] for entry in self._entries.get(url, [])]
+
+    def append(
+            self,
+            url,
+            content,
+            status_code=200,
+            headers=None,
+            fetched=None
+    ):
+        data = zlib.compress(content, self.compress_level)
+        entry = {
+            'url': url,
+            'fetched': fetched if fetched is not None else time.time(),
+            'status_code': status_code,
+            'headers': dict(headers or {}),
+            'length': len(data),
+        }
+
+        with self._lock:
+            self._data.seek(0, os.SEEK_END)
+            entry['offset'] = self._data.tell()
+            self._data.write(data)
+            self._data.flush()
+            self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._index.flush()
+            self._add(entry)
+
+    def load(self, url, at=None):
+        # The page as last fetched at or before at (a timestamp or an
+        # aware datetime), or as last fetched at all.
+        with self._lock:
+            entries = self._entries.get(url)
+
+            if not entries:
+                return None
+
+            if at is None:
+                entry = entries[-1]
+            else:
+                position = bisect.bisect_right(
+                    [entry['fetched'] for entry in entries],
+                    _timestamp(at)
+                )
+
+                if position == 0:
+                    return None
+
+                entry = entries[position - 1]
+
+            data = self._read(entry['offset'], entry['length'])
+
+        output = dict(entry)
+        output['content'] = zlib.decompress(data)
+        return output
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _load_index(self):
+        self._index.seek(0)
+
+        for line in self._index:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+
+            self._add(entry)
+
+    def _add(self, entry):
+        entries = self._entries.setdefault(entry['url'], [])
+
+        # Fetch times almost always arrive in order
+        if entries and entries[-1]['fetched'] > entry['fetched']:
+            entries.append(entry)
+            entries.sort(key=lambda entry: entry['fetched'])
+        else:
+            entries.append(entry)
+
+    def _read(self, offset, length):
+        # The map is only renewed once the file grew past it
+        if self._mmap is None or len(self._mmap) < offset + length:
+            if self._mmap is not None:
+                self._mmap.close()
+
+            self._mmap = mmap.mmap(
+                self._data.fileno(),
+                0,
+                access=mmap.ACCESS_READ
+            )
+
+        return self._mmap[offset:offset + length]
+
+
+class RecordingTransport(Transport):
+    # A Transport that appends every response it receives to archive
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def get(self, url, **kwargs):
+        response = super().get(url, **kwargs)
+
+        # A 304 answered from the response cache repeats a body already
+        # in the archive. Streamed bodies are read in full first, the
+        # stream engine then iterates over the stored content.
+        if not getattr(response, 'from_cache', False):
+            self.archive.append(
+                url,
+                response.content,
+                response.status_code,
+                response.headers
+            )
+
+        return response
+
+
+class ReplayTransport:
+    # Serves pages from archive without touching the network, as they
+    # were fetched at or before at (the latest ones when at is None).
+    # Pages missing from the archive fail like a connection error.
+    response_cache = None
+
+    def __init__(self, archive, at=None):
+        self.archive = archive
+        self.at = at
+
+    def get(self, url, **kwargs):
+        entry = self.archive.load(url, self.at)
+
+        if entry is None:
+            raise NotArchived('{} is not in the archive'.format(url))
+
+        response = requests.Response()
+        response.url = url
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers
+        )
+        response.elapsed = datetime.timedelta(0)
+        response._content = entry['content']
+        response._content_consumed = True
+
+        return response
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
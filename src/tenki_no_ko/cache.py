@@ -0,0 +1,315 @@
+import collections
+import copy
+import datetime
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+JST = datetime.timezone(datetime.timedelta(hours=9), 'JST')
+# JMA issues its regular forecasts at 05:00, 11:00 and 17:00 JST
+PUBLISH_HOURS = (5, 11, 17)
+UPDATE_DATETIME_PATTERN = re.compile(r'([0-9]+)日([0-9]+):([0-9]+)')
+
+
+def _now():
+    return datetime.datetime.now(JST)
+
+
+def _sizeof(value):
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        size += sum(
+            _sizeof(key) + _sizeof(item)
+            for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple)):
+        size += sum(_sizeof(item) for item in value)
+
+    return size
+
+
+def parse_update_datetime(update_datetime, now):
+    # update_datetime only carries the day of month and time (e.g.
+    # '20日06:00'), so the month is taken from now and rolled back when
+    # the day lies in the future.
+    match = UPDATE_DATETIME_PATTERN.search(update_datetime or '')
+
+    if match is None:
+        return None
+
+    day, hour, minute = (int(group) for group in match.groups())
+    year, month = now.year, now.month
+
+    if day > now.day:
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+
+    try:
+        return datetime.datetime(year, month, day, hour, minute, tzinfo=JST)
+    except ValueError:
+        return None
+
+
+def next_publish_time(published, publish_hours=PUBLISH_HOURS):
+    published = published.astimezone(JST)
+
+    for days in (0, 1):
+        date = published.date() + datetime.timedelta(days=days)
+
+        for hour in sorted(publish_hours):
+            candidate = datetime.datetime(
+                date.year,
+                date.month,
+                date.day,
+                hour,
+                tzinfo=JST
+            )
+
+            if candidate > published:
+                return candidate
+
+    return None
+
+
+class ForecastCache:
+    def __init__(
+            self,
+            max_entries=4096,
+            max_bytes=64 * 1024 * 1024,
+            publish_hours=PUBLISH_HOURS,
+            min_ttl=300,
+            clock=_now
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.publish_hours = publish_hours
+        # A page that is still not republished after its expected
+        # publish time is kept for at least min_ttl seconds, so a late
+        # update does not turn every request into a miss.
+        self.min_ttl = datetime.timedelta(seconds=min_ttl)
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires, _ = entry
+
+            if expires <= self.clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        # Callers get their own copy, so mutating a result never
+        # changes what later hits return.
+        return copy.deepcopy(value)
+
+    def set(self, key, value, update_datetime=None):
+        now = self.clock()
+        published = parse_update_datetime(update_datetime, now) or now
+        expires = max(
+            next_publish_time(published, self.publish_hours),
+            now + self.min_ttl
+        )
+        value = copy.deepcopy(value)
+        size = _sizeof(value)
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, expires, size)
+            self.size += size
+
+            while (
+                    len(self._entries) > self.max_entries
+                    or self.size > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def discard(self, match):
+        # Drops the entries whose key match(key) holds, e.g. those of a
+        # page known to have been published again.
+        with self._lock:
+            for key in [key for key in self._entries if match(key)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+
+class ResponseCache:
+    # Stores response bodies with their validators on disk. Every file
+    # is written to a temporary name and renamed into place, so worker
+    # processes sharing the directory only ever see whole entries.
+    # Files are evicted least recently used first, using their mtime.
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # The directory is only scanned for eviction once this process
+        # has written a sixteenth of max_bytes since the last scan.
+        self._written = 0
+        os.makedirs(directory, exist_ok=True)
+        self._evict()
+
+    def load(self, url):
+        path = self._path(url)
+
+        try:
+            with open(path, 'rb') as f:
+                metadata = json.loads(f.readline().decode('utf-8'))
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        if metadata.get('url') != url:
+            return None
+
+        metadata['body'] = body
+        return metadata
+
+    def store(self, url, body, etag=None, last_modified=None):
+        # Without validators the entry could never be revalidated
+        if etag is None and last_modified is None:
+            return None
+
+        metadata = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'digest': hashlib.sha256(body).hexdigest(),
+        }
+        self._write(
+            self._path(url),
+            json.dumps(metadata).encode('utf-8') + b'\n' + body
+        )
+
+        return metadata['digest']
+
+    def load_parsed(self, url, key, digest):
+        try:
+            with open(self._path(url, key), 'rb') as f:
+                parsed = json.loads(f.read().decode('utf-8'))
+        except (OSError, ValueError):
+            return None
+
+        # Parsed results belong to one version of the body
+        if parsed.get('digest') != digest:
+            return None
+
+        return parsed.get('output')
+
+    def store_parsed(self, url, key, digest, output):
+        parsed = {'digest': digest, 'output': output}
+        self._write(
+            self._path(url, key),
+            json.dumps(parsed, ensure_ascii=False).encode('utf-8')
+        )
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            self._remove(entry.path)
+
+    def _path(self, url, key=None):
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+        if key is not None:
+            name += '.' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+        return os.path.join(self.directory, name)
+
+    def _write(self, path, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            self._remove(temp_path)
+            return
+
+        self._written += len(data)
+
+        if self._written >= self.max_bytes // 16:
+            self._evict()
+
+    def _evict(self):
+        self._written = 0
+        entries = []
+        total = 0
+
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            if entry.name.endswith('.tmp'):
+                # Leftovers of a writer that died mid-write
+                if stat.st_mtime < time.time() - 3600:
+                    self._remove(entry.path)
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+
+            if total <= self.max_bytes:
+                break
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
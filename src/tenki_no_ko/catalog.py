@@ -0,0 +1,402 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+
+import requests
+
+from . import parsing
+from .concurrency import bounded_map
+from .scraper import _prefectures_url
+from .scraper import _subprefectures_url
+
+LOCATION_KEYS = ('region_id', 'prefecture_id', 'subprefecture_id', 'city_id')
+COLUMNS = (
+    'city_id',
+    'city_name',
+    'region_id',
+    'region_name',
+    'prefecture_id',
+    'prefecture_name',
+    'subprefecture_id',
+    'subprefecture_name',
+)
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cities (
+    city_id TEXT PRIMARY KEY,
+    city_name TEXT NOT NULL,
+    region_id TEXT NOT NULL,
+    region_name TEXT NOT NULL,
+    prefecture_id TEXT NOT NULL,
+    prefecture_name TEXT NOT NULL,
+    subprefecture_id TEXT NOT NULL,
+    subprefecture_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cities_city_name
+    ON cities (city_name);
+CREATE INDEX IF NOT EXISTS cities_prefecture
+    ON cities (prefecture_id, subprefecture_name);
+CREATE INDEX IF NOT EXISTS cities_subprefecture
+    ON cities (subprefecture_id);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    output TEXT NOT NULL
+);
+'''
+# Listing pages also carry the current weather, warnings and publish
+# time, which change at every publish. Their digest only covers the
+# forecast links and headings inside the markup holding the hierarchy,
+# found as (first opening, last opening, closing) per extractor.
+HIERARCHY_MARKUP = {
+    parsing.parse_regions: (
+        b'class="common-list-entries',
+        b'class="common-list-entries',
+        b'</table>'
+    ),
+    parsing.parse_prefectures: (
+        b'class="common-list-entries',
+        b'class="common-list-entries',
+        b'</table>'
+    ),
+    parsing.parse_subprefectures_and_cities: (
+        b'class="forecast-point-city-name',
+        b'class="forecast-point-entries',
+        b'</ul>'
+    ),
+}
+HIERARCHY_PATTERN = re.compile(
+    rb'<(?:a\s[^>]*?href="(/forecast/[^"]*)"|h4|th)[^>]*>'
+    rb'\s*([^<]*?)\s*(?=<)'
+)
+
+
+class CrawlError(Exception):
+    def __init__(self, failed):
+        super().__init__('Failed to crawl: {}'.format(failed))
+        self.failed = failed
+
+
+def _hierarchy_digest(content, parse):
+    first, last, closing = HIERARCHY_MARKUP[parse]
+    start = content.find(first)
+    end = content.find(closing, content.rfind(last))
+
+    # Unknown markup is hashed whole, so that it is always parsed
+    if start == -1 or end == -1:
+        return hashlib.sha256(content).hexdigest()
+
+    digest = hashlib.sha256()
+
+    for href, text in HIERARCHY_PATTERN.findall(content, start, end):
+        digest.update(href + b'\0' + text + b'\n')
+
+    return digest.hexdigest()
+
+
+def _fetch_listing(location_scraper, url, parse, previous_pages, pages):
+    # Listing pages are revalidated with the validators and hierarchy
+    # digest of the previous crawl. Unchanged pages, whether answered
+    # with a 304 or served again in full, reuse their stored listing
+    # and are not parsed again.
+    page = previous_pages.get(url)
+    headers = {}
+
+    if page is not None:
+        if page['etag'] is not None:
+            headers['If-None-Match'] = page['etag']
+        if page['last_modified'] is not None:
+            headers['If-Modified-Since'] = page['last_modified']
+
+    try:
+        response = location_scraper.transport.get(url, headers=headers)
+    except requests.exceptions.RequestException:
+        return None
+
+    if response.status_code == 304 and page is not None:
+        pages[url] = dict(page, parsed=False)
+        return page['output']
+
+    if response.status_code != 200:
+        return None
+
+    digest = _hierarchy_digest(response.content, parse)
+    parsed = page is None or page['digest'] != digest
+
+    if parsed:
+        output = parsing.parse_content(
+            response.content,
+            parse,
+            location_scraper.parser
+        )
+    else:
+        output = page['output']
+
+    # Error pages parse into an empty listing rather than None
+    if not output:
+        return None
+
+    pages[url] = {
+        'digest': digest,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'output': output,
+        'parsed': parsed,
+    }
+
+    return output
+
+
+def crawl(location_scraper, max_workers=8, max_in_flight=None, pages=None):
+    # Every prefecture page is independent of the others, so the whole
+    # hierarchy takes two rounds of parallel requests after the index.
+    # pages holds what an earlier crawl saw on each listing page; the
+    # pages of this crawl are returned alongside the cities.
+    base_url = location_scraper.base_url
+    previous_pages = pages if pages is not None else {}
+    pages = {}
+
+    def _fetch(url, parse):
+        return _fetch_listing(
+            location_scraper,
+            url,
+            parse,
+            previous_pages,
+            pages
+        )
+
+    regions = _fetch(base_url, parsing.parse_regions)
+
+    if regions is None:
+        raise CrawlError([base_url])
+
+    failed = []
+    prefectures = {}
+
+    for region_id, output, _ in bounded_map(
+            function=lambda region_id: _fetch(
+                _prefectures_url(base_url, region_id),
+                parsing.parse_prefectures
+            ),
+            items=regions,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight
+    ):
+        if output is None:
+            failed.append(_prefectures_url(base_url, region_id))
+            continue
+
+        for prefecture_id, prefecture_name in output.items():
+            prefectures[(region_id, prefecture_id)] = prefecture_name
+
+    cities = []
+
+    for ids, output, _ in bounded_map(
+            function=lambda ids: _fetch(
+                _subprefectures_url(base_url, *ids),
+                parsing.parse_subprefectures_and_cities
+            ),
+            items=prefectures,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight
+    ):
+        if output is None:
+            failed.append(_subprefectures_url(base_url, *ids))
+            continue
+
+        region_id, prefecture_id = ids
+
+        for subprefecture_name, city_entries in output.items():
+            for city_id, city in city_entries.items():
+                cities.append({
+                    'city_id': city_id,
+                    'city_name': city['city_name'],
+                    'region_id': region_id,
+                    'region_name': regions[region_id],
+                    'prefecture_id': prefecture_id,
+                    'prefecture_name': prefectures[ids],
+                    'subprefecture_id': city['subprefecture_id'],
+                    'subprefecture_name': subprefecture_name,
+                })
+
+    # A partial crawl would silently drop cities from the catalog
+    if failed:
+        raise CrawlError(sorted(failed))
+
+    return cities, pages
+
+
+def diff_cities(old_cities, new_cities):
+    old_cities = {city['city_id']: city for city in old_cities}
+    new_cities = {city['city_id']: city for city in new_cities}
+
+    return {
+        'added': [
+            new_cities[city_id]
+            for city_id in sorted(new_cities.keys() - old_cities.keys())
+        ],
+        'removed': [
+            old_cities[city_id]
+            for city_id in sorted(old_cities.keys() - new_cities.keys())
+        ],
+        'renamed': [
+            (old_cities[city_id], new_cities[city_id])
+            for city_id in sorted(old_cities.keys() & new_cities.keys())
+            if (
+                old_cities[city_id]['city_name']
+                != new_cities[city_id]['city_name']
+            )
+        ],
+    }
+
+
+class LocationCatalog:
+    # Location hierarchy kept in SQLite, so a process can resolve
+    # location_ids at startup without crawling tenki.jp again.
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def __len__(self):
+        return self._query('SELECT COUNT(*) FROM cities')[0][0]
+
+    def __contains__(self, city_id):
+        return self.get(city_id) is not None
+
+    def __iter__(self):
+        return iter(self.find())
+
+    def build(self, location_scraper, max_workers=8, max_in_flight=None):
+        cities, pages = crawl(location_scraper, max_workers, max_in_flight)
+        self.replace(cities, pages)
+
+        return len(cities)
+
+    def refresh(self, location_scraper, max_workers=8, max_in_flight=None):
+        # Only listing pages that changed since the last crawl are
+        # downloaded in full and parsed again.
+        cities, pages = crawl(
+            location_scraper,
+            max_workers,
+            max_in_flight,
+            pages=self.pages()
+        )
+        diff = diff_cities(self.find(), cities)
+        diff['parsed'] = sorted(
+            url for url, page in pages.items() if page['parsed']
+        )
+        self.replace(cities, pages)
+
+        return diff
+
+    def pages(self):
+        return {
+            row['url']: {
+                'digest': row['digest'],
+                'etag': row['etag'],
+                'last_modified': row['last_modified'],
+                'output': json.loads(row['output']),
+            }
+            for row in self._query('SELECT * FROM pages')
+        }
+
+    def replace(self, cities, pages=None):
+        with self._lock, self._connection:
+            if pages is not None:
+                self._connection.execute('DELETE FROM pages')
+                self._connection.executemany(
+                    'INSERT INTO pages VALUES (?, ?, ?, ?, ?)',
+                    [
+                        (
+                            url,
+                            page['digest'],
+                            page['etag'],
+                            page['last_modified'],
+                            json.dumps(page['output'], ensure_ascii=False),
+                        )
+                        for url, page in pages.items()
+                    ]
+                )
+
+            self._connection.execute('DELETE FROM cities')
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO cities ({}) VALUES ({})'.format(
+                    ', '.join(COLUMNS),
+                    ', '.join('?' * len(COLUMNS))
+                ),
+                [
+                    tuple(str(city[column]) for column in COLUMNS)
+                    for city in cities
+                ]
+            )
+
+    def get(self, city_id):
+        rows = self._query(
+            'SELECT * FROM cities WHERE city_id = ?',
+            (str(city_id),)
+        )
+
+        return dict(rows[0]) if rows else None
+
+    def location_ids(self, city_id):
+        city = self.get(city_id)
+
+        if city is None:
+            return None
+
+        return {key: city[key] for key in LOCATION_KEYS}
+
+    def find(
+            self,
+            city_name=None,
+            prefecture_id=None,
+            subprefecture_id=None,
+            subprefecture_name=None
+    ):
+        # Since subprefecture_id are not really unique, it is best
+        # combined with prefecture_id or replaced by subprefecture_name.
+        conditions = [
+            ('city_name', city_name),
+            ('prefecture_id', prefecture_id),
+            ('subprefecture_id', subprefecture_id),
+            ('subprefecture_name', subprefecture_name),
+        ]
+        conditions = [
+            (column, str(value))
+            for column, value in conditions
+            if value is not None
+        ]
+        query = 'SELECT * FROM cities'
+
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(
+                '{} = ?'.format(column) for column, _ in conditions
+            )
+
+        rows = self._query(
+            query + ' ORDER BY city_id',
+            tuple(value for _, value in conditions)
+        )
+
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _query(self, query, parameters=()):
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
@@ -0,0 +1,85 @@
+import asyncio
+import concurrent.futures
+import copy
+import threading
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one execution: the first
+    # caller runs the function, the others wait for its result. Nothing
+    # is kept once the call returns, caching is left to ForecastCache.
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        with self._lock:
+            future = self._futures.get(key)
+
+            if future is None:
+                future = concurrent.futures.Future()
+                self._futures[key] = future
+                self.calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        # The future keeps a private copy that nobody mutates, and every
+        # caller gets a result of its own, so that mutating one (e.g. in
+        # extract_city_snapshot) never leaks to the other callers.
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as exception:
+            future.set_exception(exception)
+            raise
+        else:
+            future.set_result(copy.deepcopy(result))
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._futures),
+            }
+
+
+class AsyncSingleFlight:
+    # SingleFlight for coroutines on one event loop
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._tasks = {}
+
+    async def do(self, key, function, *args, **kwargs):
+        task = self._tasks.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(function(*args, **kwargs))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self._tasks[key] = task
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        # A cancelled caller must not cancel the call the others share.
+        # The task's result stays private, every caller gets a copy.
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._tasks),
+        }
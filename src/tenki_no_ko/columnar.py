@@ -0,0 +1,280 @@
+import array
+import csv
+import datetime
+import json
+import math
+import struct
+import sys
+import zipfile
+
+SLOTS_PER_DAY = 8
+INTERVAL = 24 // SLOTS_PER_DAY
+DAYS = ('today', 'tomorrow')
+# Slot hours counted from today 00:00, i.e. 3, 6, ..., 48
+HOURS = tuple(
+    day * 24 + hour
+    for day in range(len(DAYS))
+    for hour in range(INTERVAL, 24 + INTERVAL, INTERVAL)
+)
+NUMERIC_ROWS = (
+    'temp',
+    'prob_precip',
+    'precipitation',
+    'humidity',
+    'wind_speed',
+)
+NAN = float('nan')
+# Weather codes are stored as unsigned shorts
+MAX_WEATHERS = 2 ** 16
+# .npy type descriptions of the array typecodes in use
+_BYTE_ORDER = '<' if sys.byteorder == 'little' else '>'
+_NPY_TYPES = {
+    'H': _BYTE_ORDER + 'u2',
+    'd': _BYTE_ORDER + 'f8',
+}
+
+
+def _float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _npy(data, descr, shape):
+    # Version 1.0 of the .npy format: magic, header length, a dict
+    # literal padded with spaces to a multiple of 64 bytes, then data.
+    header = (
+        "{{'descr': '{}', 'fortran_order': False, 'shape': {}, }}"
+        .format(descr, repr(tuple(shape)))
+    )
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = (header + ' ' * padding + '\n').encode('latin1')
+
+    return b''.join([
+        b'\x93NUMPY\x01\x00',
+        struct.pack('<H', len(header)),
+        header,
+        data,
+    ])
+
+
+def _npy_strings(strings):
+    width = max([len(string) for string in strings] + [1])
+    data = ''.join(string.ljust(width, '\0') for string in strings)
+
+    return _npy(
+        data.encode('utf-32-le' if _BYTE_ORDER == '<' else 'utf-32-be'),
+        '{}U{}'.format(_BYTE_ORDER, width),
+        (len(strings),)
+    )
+
+
+class ThreeHourlyColumns:
+    # 3-hourly forecasts of many cities as a cities x slots matrix: one
+    # contiguous float array per numeric row and one array of weather
+    # codes indexing the weathers vocabulary, where code 0 ('') marks a
+    # missing value. Missing numbers are NaN.
+    def __init__(self, rows=('temp',), hours=HOURS, weathers=('',)):
+        unknown_rows = set(rows) - set(NUMERIC_ROWS)
+
+        if unknown_rows:
+            raise ValueError('Unknown rows: {}'.format(sorted(unknown_rows)))
+
+        self.rows = tuple(rows)
+        self.hours = array.array('H', hours)
+        self.city_ids = []
+        self.weathers = list(weathers)
+        self.weather = array.array('H')
+        self.columns = {row: array.array('d') for row in self.rows}
+        self._codes = {
+            weather: code for code, weather in enumerate(self.weathers)
+        }
+        self._slots = {hour: slot for slot, hour in enumerate(self.hours)}
+
+    def __len__(self):
+        return len(self.city_ids)
+
+    @property
+    def slots(self):
+        return len(self.hours)
+
+    @classmethod
+    def from_forecasts(cls, forecasts, rows=('temp',)):
+        # forecasts yields (city_id, 3-hourly output) pairs, the output
+        # being None for a failed city.
+        columns = cls(rows)
+
+        for city_id, forecast in forecasts:
+            columns.append(city_id, forecast)
+
+        return columns
+
+    def append(self, city_id, forecast):
+        weather = [0] * self.slots
+        values = {row: [NAN] * self.slots for row in self.rows}
+
+        for day, key in enumerate(DAYS):
+            for slot_forecast in (forecast or {}).get(key, []):
+                try:
+                    hour = day * 24 + int(slot_forecast['hour'])
+                except (KeyError, ValueError):
+                    continue
+
+                slot = self._slots.get(hour)
+
+                if slot is None:
+                    continue
+
+                weather[slot] = self._code(slot_forecast.get('weather', ''))
+
+                for row in self.rows:
+                    values[row][slot] = _float(slot_forecast.get(row))
+
+        self.city_ids.append(city_id)
+        self.weather.extend(weather)
+
+        for row in self.rows:
+            self.columns[row].extend(values[row])
+
+    def values(self, row, index):
+        start = index * self.slots
+        return self.columns[row][start:start + self.slots]
+
+    def telops(self, index):
+        start = index * self.slots
+        return [
+            self.weathers[code]
+            for code in self.weather[start:start + self.slots]
+        ]
+
+    def window(self, start, length):
+        # Every slot of the window is one strided copy over all cities,
+        # so the cost does not grow with Python work per city. With
+        # numpy, slicing to_numpy()[row][:, start:stop] copies nothing.
+        output = ThreeHourlyColumns(
+            self.rows,
+            self.hours[start:start + length],
+            self.weathers
+        )
+        output.city_ids = list(self.city_ids)
+        size = len(self) * output.slots
+        output.weather = array.array('H', [0]) * size
+        output.columns = {
+            row: array.array('d', [NAN]) * size for row in self.rows
+        }
+
+        for slot in range(output.slots):
+            source = slice(start + slot, None, self.slots)
+            target = slice(slot, None, output.slots)
+            output.weather[target] = self.weather[source]
+
+            for row in self.rows:
+                output.columns[row][target] = self.columns[row][source]
+
+        return output
+
+    def next_24_hours(self, now=None):
+        # Same window as extract_3_hourly_forecasts_for_next_24_hours,
+        # for every city at once.
+        now = now if now is not None else datetime.datetime.now()
+        return self.window(int(now.hour / INTERVAL), SLOTS_PER_DAY)
+
+    def to_numpy(self):
+        # Copies, since a view exporting the buffers of the arrays would
+        # make every later append fail while it is alive.
+        import numpy
+
+        shape = (len(self), self.slots)
+        output = {
+            'city_ids': numpy.array(self.city_ids, dtype=str),
+            'hours': numpy.array(self.hours, dtype=numpy.uint16),
+            'weathers': numpy.array(self.weathers, dtype=str),
+            'weather': (
+                numpy.array(self.weather, dtype=numpy.uint16)
+                .reshape(shape)
+            ),
+        }
+
+        for row in self.rows:
+            output[row] = (
+                numpy.array(self.columns[row], dtype=numpy.float64)
+                .reshape(shape)
+            )
+
+        return output
+
+    def write_ndjson(self, f):
+        for index, city_id in enumerate(self.city_ids):
+            record = {
+                'city_id': city_id,
+                'hours': list(self.hours),
+                'weather': self.telops(index),
+            }
+
+            for row in self.rows:
+                record[row] = [
+                    None if math.isnan(value) else value
+                    for value in self.values(row, index)
+                ]
+
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def write_csv(self, f):
+        writer = csv.writer(f)
+        writer.writerow(('city_id', 'hour', 'weather') + self.rows)
+
+        for index, city_id in enumerate(self.city_ids):
+            weathers = self.telops(index)
+            values = [self.values(row, index) for row in self.rows]
+
+            for slot, hour in enumerate(self.hours):
+                writer.writerow(
+                    [city_id, hour, weathers[slot]]
+                    + [
+                        '' if math.isnan(column[slot]) else column[slot]
+                        for column in values
+                    ]
+                )
+
+    def write_npz(self, file, compress=False):
+        # Written by hand in the .npy format, so that numpy is only
+        # needed to read the file back (numpy.load).
+        shape = (len(self), self.slots)
+        entries = [
+            ('city_ids', _npy_strings(self.city_ids)),
+            (
+                'hours',
+                _npy(self.hours.tobytes(), _NPY_TYPES['H'], (self.slots,))
+            ),
+            ('weathers', _npy_strings(self.weathers)),
+            (
+                'weather',
+                _npy(self.weather.tobytes(), _NPY_TYPES['H'], shape)
+            ),
+        ]
+        entries.extend(
+            (row, _npy(self.columns[row].tobytes(), _NPY_TYPES['d'], shape))
+            for row in self.rows
+        )
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+        with zipfile.ZipFile(file, 'w', compression) as archive:
+            for name, data in entries:
+                archive.writestr(name + '.npy', data)
+
+    def _code(self, weather):
+        code = self._codes.get(weather)
+
+        if code is None:
+            code = len(self.weathers)
+
+            if code >= MAX_WEATHERS:
+                raise ValueError(
+                    'Too many distinct weathers: {}'.format(MAX_WEATHERS)
+                )
+
+            self.weathers.append(weather)
+            self._codes[weather] = code
+
+        return code
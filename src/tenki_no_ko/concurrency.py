@@ -0,0 +1,65 @@
+import concurrent.futures
+
+
+def bounded_map(
+        function,
+        items,
+        max_workers=8,
+        max_in_flight=None,
+        ordered=False
+):
+    # Items are submitted lazily so that no more than max_in_flight
+    # calls are queued, running or waiting to be consumed at any time;
+    # a slow consumer therefore holds back new calls. Results are
+    # yielded as (item, result, exception) tuples in completion order,
+    # or in input order when ordered is set.
+    if max_in_flight is None:
+        max_in_flight = max_workers * 2
+
+    # Nothing would ever be submitted
+    if max_in_flight < 1:
+        raise ValueError('max_in_flight must be greater than 0')
+
+    items = iter(items)
+    pending = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        def _submit(count):
+            if count <= 0:
+                return
+
+            for item in items:
+                pending[executor.submit(function, item)] = item
+                count -= 1
+
+                if count == 0:
+                    break
+
+        try:
+            _submit(max_in_flight)
+
+            while pending:
+                if ordered:
+                    # pending keeps submission order, so its first
+                    # future is the next one due
+                    done = [next(iter(pending))]
+                    concurrent.futures.wait(done)
+                else:
+                    done, _ = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+
+                for future in done:
+                    item = pending.pop(future)
+                    exception = future.exception()
+
+                    if exception is None:
+                        yield item, future.result(), None
+                    else:
+                        yield item, None, exception
+
+                _submit(max_in_flight - len(pending))
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,150 @@
+import functools
+import threading
+
+from .concurrency import bounded_map
+from .scraper import _forecast_url
+from .scraper import _has_data
+
+SUMMARY_PAGE = ''
+THREE_HOURLY_PAGE = '3hours.html'
+
+
+class ChangeTracker:
+    # Polls forecast pages cheaply: only the heading of a page is read
+    # to learn its publish time, and the full extraction only runs when
+    # that time differs from the one remembered for the page. Unchanged
+    # pages give None. update_datetimes maps page URLs to publish times
+    # and may be saved (e.g. as JSON) and handed back after a restart.
+    def __init__(self, weather_scraper, update_datetimes=None):
+        self.weather_scraper = weather_scraper
+        self.update_datetimes = (
+            update_datetimes if update_datetimes is not None else {}
+        )
+        self.checked = 0
+        self.changed = 0
+        self._lock = threading.Lock()
+
+    def extract_forecast_summary(self, location_ids):
+        return self._extract_if_changed(
+            location_ids,
+            SUMMARY_PAGE,
+            self.weather_scraper.extract_forecast_summary
+        )
+
+    def extract_3_hourly_forecasts(self, location_ids, extra_rows=()):
+        return self._extract_if_changed(
+            location_ids,
+            THREE_HOURLY_PAGE,
+            self.weather_scraper.extract_3_hourly_forecasts,
+            extra_rows
+        )
+
+    def iter_forecast_summaries(
+            self,
+            locations,
+            max_workers=8,
+            max_in_flight=None,
+            ordered=False
+    ):
+        return self._iter_changes(
+            extractor=self.extract_forecast_summary,
+            locations=locations,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight,
+            ordered=ordered
+        )
+
+    def iter_3_hourly_forecasts(
+            self,
+            locations,
+            max_workers=8,
+            max_in_flight=None,
+            ordered=False
+    ):
+        return self._iter_changes(
+            extractor=self.extract_3_hourly_forecasts,
+            locations=locations,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight,
+            ordered=ordered
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'changed': self.changed,
+                'unchanged': self.checked - self.changed,
+            }
+
+    def _extract_if_changed(self, location_ids, page, extractor, *args):
+        weather_scraper = self.weather_scraper
+
+        try:
+            url = _forecast_url(
+                weather_scraper.base_url,
+                weather_scraper._resolve(location_ids),
+                page
+            )
+        except AttributeError:
+            url = None
+
+        update_datetime = weather_scraper.extract_update_datetime(
+            location_ids,
+            page
+        )
+
+        with self._lock:
+            self.checked += 1
+            previous = self.update_datetimes.get(url)
+
+            if update_datetime and update_datetime == previous:
+                return None
+
+            self.changed += 1
+
+        # Outputs cached before the new publish would otherwise be
+        # served (and remembered) as the new forecasts. A heading that
+        # could not be read is treated as a change, so that failures
+        # show up in the full extraction's output.
+        if update_datetime and url is not None:
+            weather_scraper._discard_cached(url)
+
+        # Only failures of the full extraction end up in the records
+        weather_scraper._failures.error = None
+        output = extractor(location_ids, *args)
+
+        if update_datetime and _has_data(output):
+            with self._lock:
+                self.update_datetimes[url] = update_datetime
+
+        return output
+
+    def _iter_changes(
+            self,
+            extractor,
+            locations,
+            max_workers,
+            max_in_flight,
+            ordered
+    ):
+        # A page that could not be fetched gets its error, as in the
+        # records of WeatherScraper.iter_forecast_summaries.
+        for location_ids, forecast, exception in bounded_map(
+                function=functools.partial(
+                    self.weather_scraper._call_raising,
+                    extractor
+                ),
+                items=locations,
+                max_workers=max_workers,
+                max_in_flight=max_in_flight,
+                ordered=ordered
+        ):
+            if forecast is None and exception is None:
+                continue
+
+            yield {
+                'location_ids': location_ids,
+                'forecast': forecast,
+                'error': exception,
+            }
@@ -0,0 +1,192 @@
+import email.utils
+import threading
+import time
+import urllib.parse
+
+
+def _host(url):
+    return urllib.parse.urlsplit(url).netloc
+
+
+def parse_retry_after(value, now=None):
+    # Retry-After is either a number of seconds or an HTTP date
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    now = now if now is not None else time.time()
+    return max(date.timestamp() - now, 0.0)
+
+
+class _HostState:
+    def __init__(self, tokens, limit, now):
+        self.tokens = tokens
+        self.refilled = now
+        self.limit = limit
+        self.in_flight = 0
+        self.blocked_until = now
+        self.sent = 0
+        self.decreased = 0
+        self.latency = None
+        self.requests = 0
+        self.throttled = 0
+
+
+class AdaptiveLimiter:
+    # Paces requests per host with a token bucket of rate requests per
+    # second, and caps the requests in flight per host with a limit
+    # adjusted AIMD style: it grows by about one per window of healthy
+    # responses and is multiplied by decrease_factor on 429, 5xx,
+    # connection errors and responses slower than latency_factor times
+    # the smoothed latency. A Retry-After holds back the whole host.
+    def __init__(
+            self,
+            rate=10.0,
+            burst=None,
+            initial_concurrency=4,
+            min_concurrency=1,
+            max_concurrency=32,
+            decrease_factor=0.5,
+            latency_factor=3.0,
+            smoothing=0.2
+    ):
+        if not 0 < decrease_factor < 1:
+            raise ValueError('decrease_factor must be between 0 and 1')
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 1, 1)
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.smoothing = smoothing
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _state(self, host, now):
+        state = self._hosts.get(host)
+
+        if state is None:
+            state = _HostState(self.burst, self.initial_concurrency, now)
+            self._hosts[host] = state
+
+        return state
+
+    def _refill(self, state, now):
+        if self.rate is None:
+            return
+
+        state.tokens = min(
+            self.burst,
+            state.tokens + (now - state.refilled) * self.rate
+        )
+        state.refilled = now
+
+    def acquire(self, url):
+        host = _host(url)
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                state = self._state(host, now)
+                self._refill(state, now)
+
+                if now < state.blocked_until:
+                    timeout = state.blocked_until - now
+                elif state.in_flight >= int(state.limit):
+                    # Woken up by release
+                    timeout = None
+                elif self.rate is not None and state.tokens < 1:
+                    timeout = (1 - state.tokens) / self.rate
+                else:
+                    break
+
+                self._condition.wait(timeout)
+
+            if self.rate is not None:
+                state.tokens -= 1
+
+            state.in_flight += 1
+            state.requests += 1
+            state.sent += 1
+
+            return state.sent
+
+    def release(
+            self,
+            url,
+            ticket,
+            status_code=None,
+            latency=0.0,
+            retry_after=None
+    ):
+        # ticket is what acquire returned, status_code is None when the
+        # request failed without a response.
+        host = _host(url)
+
+        with self._condition:
+            now = time.monotonic()
+            state = self._state(host, now)
+            state.in_flight -= 1
+            delay = parse_retry_after(retry_after)
+
+            if delay is not None:
+                state.blocked_until = max(state.blocked_until, now + delay)
+
+            spike = (
+                state.latency is not None
+                and latency > state.latency * self.latency_factor
+            )
+            failed = (
+                status_code is None
+                or status_code == 429
+                or status_code >= 500
+            )
+
+            if failed or spike:
+                state.throttled += 1
+
+                # Responses to requests sent before the last decrease
+                # report the same congestion, so decrease once per window
+                if ticket > state.decreased:
+                    state.limit = max(
+                        self.min_concurrency,
+                        state.limit * self.decrease_factor
+                    )
+                    state.decreased = state.sent
+            else:
+                state.limit = min(
+                    self.max_concurrency,
+                    state.limit + 1 / state.limit
+                )
+
+            if not failed:
+                if state.latency is None:
+                    state.latency = latency
+                else:
+                    state.latency += self.smoothing * (latency - state.latency)
+
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                host: {
+                    'limit': int(state.limit),
+                    'in_flight': state.in_flight,
+                    'latency': state.latency,
+                    'requests': state.requests,
+                    'throttled': state.throttled,
+                }
+                for host, state in self._hosts.items()
+            }
@@ -0,0 +1,135 @@
+import json
+import threading
+
+PREFIX = 'tenki_no_ko'
+# Phases of a scrape, in order. wait runs until the response headers
+# arrived (DNS, connect and server time), transfer reads the body,
+# parse builds the tree (in the executor, also extracts), extract runs
+# the find chains of an extractor and stream does all of it while
+# downloading.
+PHASES = ('wait', 'transfer', 'parse', 'extract', 'stream')
+OUTCOMES = ('success', 'parse_miss', 'network_error', 'cache_hit')
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Metrics:
+    # Counters of every scrape made by the scrapers it is given to.
+    # Hooks are called with a dict per event, e.g.
+    # {'event': 'phase', 'phase': 'parse', 'url': ..., 'seconds': ...,
+    # 'bytes': ...} or {'event': 'outcome', 'extractor': ...,
+    # 'url': ..., 'outcome': ..., 'error': ...}.
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self._phases = {}
+        self._outcomes = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def phase(self, phase, url, seconds, size=0):
+        with self._lock:
+            totals = self._phases.setdefault(phase, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += size
+
+        for hook in self.hooks:
+            hook({
+                'event': 'phase',
+                'phase': phase,
+                'url': url,
+                'seconds': seconds,
+                'bytes': size,
+            })
+
+    def fetched(self, url, response, seconds):
+        # requests measures the time until the headers were parsed,
+        # the rest of the call went to reading the body.
+        elapsed = getattr(response, 'elapsed', None)
+        wait = min(elapsed.total_seconds(), seconds) if elapsed else 0.0
+
+        self.phase('wait', url, wait)
+        self.phase('transfer', url, seconds - wait, len(response.content))
+
+    def outcome(self, extractor, url, outcome, error=None):
+        with self._lock:
+            key = (extractor, outcome)
+            self._outcomes[key] = self._outcomes.get(key, 0) + 1
+
+        for hook in self.hooks:
+            hook({
+                'event': 'outcome',
+                'extractor': extractor,
+                'url': url,
+                'outcome': outcome,
+                'error': error,
+            })
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+            self._outcomes.clear()
+
+    def snapshot(self):
+        with self._lock:
+            phases = {
+                phase: {'count': count, 'seconds': seconds, 'bytes': size}
+                for phase, (count, seconds, size) in self._phases.items()
+            }
+            extractors = {}
+
+            for (extractor, outcome), count in self._outcomes.items():
+                outcomes = extractors.setdefault(
+                    extractor,
+                    dict.fromkeys(OUTCOMES, 0)
+                )
+                outcomes[outcome] = count
+
+        return {'phases': phases, 'extractors': extractors}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        metrics = [
+            ('phase_calls_total', 'count', 'Calls per scrape phase.'),
+            ('phase_seconds_total', 'seconds', 'Seconds per scrape phase.'),
+            ('phase_bytes_total', 'bytes', 'Bytes per scrape phase.'),
+        ]
+
+        for name, field, description in metrics:
+            lines.append('# HELP {}_{} {}'.format(PREFIX, name, description))
+            lines.append('# TYPE {}_{} counter'.format(PREFIX, name))
+            lines.extend(
+                '{}_{}{{phase="{}"}} {}'.format(
+                    PREFIX,
+                    name,
+                    _label(phase),
+                    snapshot['phases'][phase][field]
+                )
+                for phase in sorted(snapshot['phases'])
+            )
+
+        lines.append(
+            '# HELP {}_extractions_total Scrapes per extractor and outcome.'
+            .format(PREFIX)
+        )
+        lines.append('# TYPE {}_extractions_total counter'.format(PREFIX))
+        lines.extend(
+            '{}_extractions_total{{extractor="{}",outcome="{}"}} {}'.format(
+                PREFIX,
+                _label(extractor),
+                outcome,
+                count
+            )
+            for extractor in sorted(snapshot['extractors'])
+            for outcome, count in snapshot['extractors'][extractor].items()
+        )
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,422 @@
+import copy
+import functools
+import logging
+import re
+
+from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
+from bs4.builder import builder_registry
+
+DEFAULT_PARSER = 'html.parser'
+THREE_HOURLY_TABLES = [
+    'forecast-point-3h-today',
+    'forecast-point-3h-tomorrow',
+]
+# Row class to slot key. The wind direction row is classed differently
+# in the today and tomorrow tables.
+THREE_HOURLY_ROWS = {
+    'hour': 'hour',
+    'weather': 'weather',
+    'temperature': 'temp',
+    'prob-precip': 'prob_precip',
+    'precipitation': 'precipitation',
+    'humidity': 'humidity',
+    'wind-direction': 'wind_direction',
+    'wind-blow': 'wind_direction',
+    'wind-speed': 'wind_speed',
+}
+THREE_HOURLY_EXTRA_ROWS = (
+    'prob_precip',
+    'precipitation',
+    'humidity',
+    'wind_direction',
+    'wind_speed',
+)
+# Map and list entries on the top, region and prefecture pages
+LISTING_ENTRY_PATTERN = re.compile(r'^forecast-(?:map-)?entry-([0-9]+)$')
+DATE_PATTERN = re.compile(r'([0-9]+月[0-9]+日\([日|月|火|水|木|金|土]\))')
+
+logger = logging.getLogger(__name__)
+
+
+def _ignore_exceptions(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except AttributeError:
+            # Missing elements are expected on error pages, but leave a
+            # trace for when the markup changed under an extractor.
+            logger.debug('%s found no data', function.__name__, exc_info=True)
+            return None
+
+    return wrapper
+
+
+def _parse_only(*selectors):
+    # Declare the (tag name, class) pairs whose subtrees an extractor
+    # reads, so that everything else on the page is skipped while
+    # building the tree. A class of None matches any tag of that name.
+    def _match(name, attrs):
+        classes = attrs.get('class') or ''
+
+        if isinstance(classes, str):
+            classes = classes.split()
+
+        return any(
+            name == tag_name and (class_ is None or class_ in classes)
+            for tag_name, class_ in selectors
+        )
+
+    def decorator(function):
+        function.parse_only = SoupStrainer(_match)
+        return function
+
+    return decorator
+
+
+def resolve_parser(parser):
+    # Fall back to the pure Python tree builder when the requested one
+    # (e.g. 'lxml') is not installed.
+    if builder_registry.lookup(parser) is None:
+        return DEFAULT_PARSER
+
+    return parser
+
+
+def make_soup(content, parser=DEFAULT_PARSER, parse_only=None):
+    return BeautifulSoup(content, parser, parse_only=parse_only)
+
+
+def parse_content(content, parse, parser=DEFAULT_PARSER, **kwargs):
+    # Build the tree and run the extractor in one call so that both
+    # can be pushed off the event loop (or into another process)
+    # together, and only the extracted output has to travel back.
+    if content is None:
+        return parse(None, **kwargs)
+
+    return parse(make_soup(content, parser, parse.parse_only), **kwargs)
+
+
+@_parse_only(('table', 'common-list-entries'))
+@_ignore_exceptions
+def parse_regions(soup):
+    regions = {}
+    th_tags = (
+        soup
+        .find('table', class_='common-list-entries')
+        .find_all('th')
+    )
+
+    for th_tag in th_tags:
+        region_id = th_tag.a['href'].split('/')[-2]
+        regions[region_id] = th_tag.get_text(strip=True)
+
+    return regions
+
+
+@_parse_only(('table', 'common-list-entries'))
+@_ignore_exceptions
+def parse_prefectures(soup):
+    prefectures = {}
+    li_tags = (
+        soup
+        .find('table', class_='common-list-entries')
+        .find('tr')
+        .find_all('li')
+    )
+
+    for li_tag in li_tags:
+        a_tag = li_tag.find('a', class_='pref-link')
+        prefecture_id = a_tag['href'].split('/')[-2]
+        prefectures[prefecture_id] = a_tag.get_text(strip=True)
+
+    return prefectures
+
+
+@_parse_only(
+    ('h4', 'forecast-point-city-name'),
+    ('ul', 'forecast-point-entries')
+)
+@_ignore_exceptions
+def parse_subprefectures_and_cities(soup):
+    output = {}
+    h4_tags = (
+        soup.
+        find_all('h4', class_='forecast-point-city-name')
+    )
+    for h4_tag in h4_tags:
+        # Since subprefecture_id are not really unique,
+        # subprefecture_name is used as dictionary key instead.
+        subprefecture_name = h4_tag.get_text(strip=True)
+        output[subprefecture_name] = {}
+        li_tags = h4_tag.find_next().find_all('li')
+
+        for li_tag in li_tags:
+            splitted_url = li_tag.a['href'].split('/')
+            city_id = splitted_url[-2]
+            subprefecture_id = splitted_url[-3]
+
+            output[subprefecture_name][city_id] = {
+                    'subprefecture_id': subprefecture_id,
+                    'city_name': li_tag.a.get_text(strip=True)
+            }
+
+    return output
+
+
+@_parse_only(
+    ('h2', None),
+    ('section', 'today-weather'),
+    ('section', 'tomorrow-weather')
+)
+def parse_forecast_summary(soup):
+    def _extract_forecast_data(section_tag):
+        try:
+            date = DATE_PATTERN.search(
+                section_tag.h3.get_text(strip=True)
+            ).group(1)
+            weather = (
+                section_tag
+                .find('p', class_='weather-telop')
+                .get_text(strip=True)
+            )
+            highest_temperature = '{} {}'.format(
+                (
+                    section_tag
+                    .find('dd', class_='high-temp temp')
+                    .get_text(strip=True)
+                ),
+                (
+                    section_tag
+                    .find('dd', class_='high-temp tempdiff')
+                    .get_text(strip=True)
+                ),
+            )
+            lowest_temperature = '{} {}'.format(
+                (
+                    section_tag
+                    .find('dd', class_='low-temp temp')
+                    .get_text(strip=True)
+                ),
+                (
+                    section_tag
+                    .find('dd', class_='low-temp tempdiff')
+                    .get_text(strip=True)
+                ),
+            )
+
+            return {
+                'date': date,
+                'weather': weather,
+                'temps': {
+                    'high': highest_temperature,
+                    'low': lowest_temperature
+                },
+            }
+        except AttributeError:
+            return {
+                'date': '',
+                'weather': '',
+                'temps': {
+                    'high': '',
+                    'low': ''
+                },
+            }
+
+    try:
+        # The page heading is the parent of the first date-time tag,
+        # which also holds when only the h2 subtree has been parsed.
+        time_tag = soup.find('time', class_='date-time')
+        h2_tag = time_tag.find_parent('h2')
+        update_datetime = (
+            time_tag
+            .get_text(strip=True)
+            .replace('発表', '')
+        )
+
+        # Prevent the original tree from being modified
+        # when calling extract() method
+        h2_tag_copy = copy.copy(h2_tag)
+        h2_tag_copy.time.extract()
+        city = h2_tag_copy.get_text(strip=True).replace('の天気', '')
+
+        today_section = soup.find('section', class_='today-weather')
+        tomorrow_section = soup.find('section', class_='tomorrow-weather')
+    except AttributeError:
+        city = ''
+        update_datetime = ''
+        today_section = None
+        tomorrow_section = None
+
+    return {
+        'city': city,
+        'update_datetime': update_datetime,
+        'forecasts': {
+            'today': _extract_forecast_data(today_section),
+            'tomorrow': _extract_forecast_data(tomorrow_section)
+        }
+    }
+
+
+@_parse_only(('h2', None))
+def parse_forecast_header(soup):
+    # Only the publish time in the page heading, which the forecast and
+    # 3-hourly pages share, to tell whether the forecasts changed.
+    try:
+        update_datetime = (
+            soup
+            .find('time', class_='date-time')
+            .get_text(strip=True)
+            .replace('発表', '')
+        )
+    except AttributeError:
+        update_datetime = ''
+
+    return {'update_datetime': update_datetime}
+
+
+def three_hourly_keys(extra_rows=()):
+    unknown_rows = set(extra_rows) - set(THREE_HOURLY_EXTRA_ROWS)
+
+    if unknown_rows:
+        raise ValueError('Unknown rows: {}'.format(sorted(unknown_rows)))
+
+    return ('hour', 'weather', 'temp') + tuple(extra_rows)
+
+
+@_parse_only(('table', 'forecast-point-3h'))
+def parse_3_hourly_forecasts(soup, extra_rows=()):
+    keys = three_hourly_keys(extra_rows)
+
+    def _extract_forecast_data(table):
+        forecasts = []
+
+        try:
+            # Walk the table rows once and pick the wanted ones by class
+            # instead of searching the table again for every row.
+            rows = {}
+
+            for tr_tag in table.find_all('tr'):
+                for class_ in tr_tag.get('class', []):
+                    key = THREE_HOURLY_ROWS.get(class_)
+
+                    if key in keys and key not in rows:
+                        rows[key] = [
+                            td_tag.get_text(strip=True)
+                            for td_tag in tr_tag.find_all('td')
+                        ]
+
+            for index in range(len(rows['hour'])):
+                forecasts.append({key: rows[key][index] for key in keys})
+        except (AttributeError, IndexError, KeyError):
+            START_HOUR = 3
+            HOURS_IN_A_DAY = 24
+            INTERVAL = 3
+
+            forecasts = []
+            for hour in range(
+                    START_HOUR,
+                    HOURS_IN_A_DAY + INTERVAL,
+                    INTERVAL
+            ):
+                forecast = {key: '' for key in keys}
+                forecast['hour'] = str(hour).zfill(2)
+                forecasts.append(forecast)
+
+        return forecasts
+
+    tables = {}
+
+    try:
+        for table in soup.find_all('table', id=THREE_HOURLY_TABLES):
+            tables.setdefault(table['id'], table)
+    except AttributeError:
+        pass
+
+    return {
+        'today': _extract_forecast_data(
+            tables.get('forecast-point-3h-today')
+        ),
+        'tomorrow': _extract_forecast_data(
+            tables.get('forecast-point-3h-tomorrow')
+        )
+    }
+
+
+@_parse_only(('a', None), ('time', 'date-time'))
+def parse_listing_forecasts(soup):
+    def _extract_forecast_data(a_tag, city_id):
+        # Entry links only point as deep as the page they lead to (e.g.
+        # a region page on the top page). Partial ids would build broken
+        # forecast URLs, so location_ids is None unless the link leads
+        # to the city itself.
+        ids = [part for part in a_tag['href'].split('/') if part][1:4]
+
+        if len(ids) == 3:
+            location_ids = dict(
+                zip(('region_id', 'prefecture_id', 'subprefecture_id'), ids)
+            )
+            location_ids['city_id'] = city_id
+        else:
+            location_ids = None
+        name_tag = a_tag.find('p', class_='name')
+
+        if name_tag is not None:
+            city = name_tag.get_text(strip=True)
+        else:
+            city = next(a_tag.stripped_strings)
+
+        return {
+            'location_ids': location_ids,
+            'city': city,
+            'weather': a_tag.find('img', class_='forecast-image')['alt'],
+            'temps': {
+                'high': (
+                    a_tag
+                    .find('span', class_='max-temp')
+                    .get_text(strip=True)
+                ),
+                'low': (
+                    a_tag
+                    .find('span', class_='min-temp')
+                    .get_text(strip=True)
+                ),
+            },
+            'prob_precip': (
+                a_tag
+                .find('span', class_='prob-precip')
+                .get_text(strip=True)
+            ),
+        }
+
+    forecasts = {}
+
+    try:
+        update_datetime = (
+            soup
+            .find('time', id='forecast-map-announce-datetime')
+            .get_text(strip=True)
+            .replace('発表', '')
+        )
+        a_tags = soup.find_all('a', id=LISTING_ENTRY_PATTERN)
+    except AttributeError:
+        update_datetime = ''
+        a_tags = []
+
+    for a_tag in a_tags:
+        # A point shown both on the map and in the list is read once
+        city_id = LISTING_ENTRY_PATTERN.match(a_tag['id']).group(1)
+
+        if city_id in forecasts:
+            continue
+
+        try:
+            forecasts[city_id] = _extract_forecast_data(a_tag, city_id)
+        except (AttributeError, KeyError, StopIteration):
+            continue
+
+    return {
+        'update_datetime': update_datetime,
+        'forecasts': forecasts,
+    }
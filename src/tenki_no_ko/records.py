@@ -0,0 +1,229 @@
+import collections
+import datetime
+import re
+import sys
+
+from . import parsing
+from .cache import _now
+from .cache import parse_update_datetime
+
+NUMBER_PATTERN = re.compile(r'[-+]?[0-9]+(?:\.[0-9]+)?')
+MONTH_DAY_PATTERN = re.compile(r'([0-9]+)月([0-9]+)日')
+WEEKDAYS = '月火水木金土日'
+# Type and text format of the numeric 3-hourly rows
+THREE_HOURLY_NUMBERS = {
+    'hour': (int, '{:02d}'),
+    'temp': (float, '{:.1f}'),
+    'prob_precip': (int, '{:d}'),
+    'precipitation': (float, '{:g}'),
+    'humidity': (int, '{:d}'),
+    'wind_speed': (int, '{:d}'),
+}
+BASE_KEYS = parsing.three_hourly_keys()
+
+
+def _number(text, type_=int):
+    match = NUMBER_PATTERN.search(text or '')
+
+    if match is None:
+        return None
+
+    return type_(match.group())
+
+
+def _tempdiff(value):
+    if value is None:
+        return '-'
+
+    return '{:+d}'.format(value) if value else '0'
+
+
+def _date(text, published):
+    # Forecast dates carry no year (e.g. '08月21日(金)'); it is taken
+    # from the publish date, moving on to the next year in late December.
+    match = MONTH_DAY_PATTERN.search(text or '')
+
+    if match is None:
+        return None
+
+    month, day = (int(group) for group in match.groups())
+    year = published.year
+
+    if month < published.month:
+        year += 1
+
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+class DailyForecast(collections.namedtuple(
+        'DailyForecast',
+        'date weather high_temp high_tempdiff low_temp low_tempdiff'
+)):
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, forecast, published):
+        high = forecast['temps']['high'].split()
+        low = forecast['temps']['low'].split()
+
+        return cls(
+            date=_date(forecast['date'], published),
+            weather=sys.intern(forecast['weather']),
+            high_temp=_number(high[0] if high else None),
+            high_tempdiff=_number(high[-1] if len(high) > 1 else None),
+            low_temp=_number(low[0] if low else None),
+            low_tempdiff=_number(low[-1] if len(low) > 1 else None),
+        )
+
+    def to_dict(self):
+        if self.date is None:
+            return {
+                'date': '',
+                'weather': self.weather,
+                'temps': {
+                    'high': '',
+                    'low': '',
+                },
+            }
+
+        return {
+            'date': '{:%m月%d日}({})'.format(
+                self.date,
+                WEEKDAYS[self.date.weekday()]
+            ),
+            'weather': self.weather,
+            'temps': {
+                'high': '{}℃ [{}]'.format(
+                    '-' if self.high_temp is None else self.high_temp,
+                    _tempdiff(self.high_tempdiff)
+                ),
+                'low': '{}℃ [{}]'.format(
+                    '-' if self.low_temp is None else self.low_temp,
+                    _tempdiff(self.low_tempdiff)
+                ),
+            },
+        }
+
+
+class ForecastSummary(collections.namedtuple(
+        'ForecastSummary',
+        'city update_datetime today tomorrow'
+)):
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, output, now=None):
+        now = now if now is not None else _now()
+        update_datetime = parse_update_datetime(
+            output['update_datetime'],
+            now
+        )
+        published = (update_datetime or now).date()
+
+        return cls(
+            city=output['city'],
+            update_datetime=update_datetime,
+            today=DailyForecast.from_dict(
+                output['forecasts']['today'],
+                published
+            ),
+            tomorrow=DailyForecast.from_dict(
+                output['forecasts']['tomorrow'],
+                published
+            ),
+        )
+
+    def to_dict(self):
+        if self.update_datetime is None:
+            update_datetime = ''
+        else:
+            update_datetime = '{}日{:%H:%M}'.format(
+                self.update_datetime.day,
+                self.update_datetime
+            )
+
+        return {
+            'city': self.city,
+            'update_datetime': update_datetime,
+            'forecasts': {
+                'today': self.today.to_dict(),
+                'tomorrow': self.tomorrow.to_dict(),
+            },
+        }
+
+
+class ThreeHourlyForecast(collections.namedtuple(
+        'ThreeHourlyForecast',
+        BASE_KEYS + parsing.THREE_HOURLY_EXTRA_ROWS,
+        defaults=(None,) * len(parsing.THREE_HOURLY_EXTRA_ROWS)
+)):
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, forecast):
+        # Weather and wind direction take a handful of values, so
+        # interning them leaves one copy for all records.
+        return cls(**{
+            key: (
+                _number(value, THREE_HOURLY_NUMBERS[key][0])
+                if key in THREE_HOURLY_NUMBERS
+                else sys.intern(value)
+            )
+            for key, value in forecast.items()
+        })
+
+    def to_dict(self, keys=BASE_KEYS):
+        # Slots left empty after a failed scrape are empty strings,
+        # values missing on the page (e.g. past precipitation chances)
+        # read '---' as on tenki.jp.
+        missing = '---' if self.weather else ''
+        output = {}
+
+        for key in keys:
+            value = getattr(self, key)
+
+            if value is None:
+                output[key] = missing
+            elif key in THREE_HOURLY_NUMBERS:
+                output[key] = THREE_HOURLY_NUMBERS[key][1].format(value)
+            else:
+                output[key] = value
+
+        return output
+
+
+class ThreeHourlyForecasts(collections.namedtuple(
+        'ThreeHourlyForecasts',
+        'today tomorrow keys'
+)):
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, output):
+        forecasts = output['today'] + output['tomorrow']
+        keys = tuple(forecasts[0]) if forecasts else BASE_KEYS
+
+        return cls(
+            today=tuple(
+                ThreeHourlyForecast.from_dict(forecast)
+                for forecast in output['today']
+            ),
+            tomorrow=tuple(
+                ThreeHourlyForecast.from_dict(forecast)
+                for forecast in output['tomorrow']
+            ),
+            keys=keys,
+        )
+
+    def to_dict(self):
+        return {
+            'today': [
+                forecast.to_dict(self.keys) for forecast in self.today
+            ],
+            'tomorrow': [
+                forecast.to_dict(self.keys) for forecast in self.tomorrow
+            ],
+        }
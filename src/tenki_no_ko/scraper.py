@@ -1,284 +1,621 @@
-import copy
+import concurrent.futures
 import datetime
 import functools
-import re
+import logging
+import threading
+import time
 
 import requests
-from bs4 import BeautifulSoup
 
+from . import parsing
+from . import streaming
+from .concurrency import bounded_map
+from .transport import Transport
 
-def _ignore_exceptions(function):
-    @functools.wraps(function)
-    def wrapper(*args, **kwargs):
-        try:
-            return function(*args, **kwargs)
-        except AttributeError:
-            return None
+BASE_URL = 'https://tenki.jp'
+
+logger = logging.getLogger(__name__)
+
+
+def _prefectures_url(base_url, region_id):
+    return '{}/forecast/{}/'.format(base_url, region_id)
+
+
+def _subprefectures_url(base_url, region_id, prefecture_id):
+    return '{}/forecast/{}/{}/'.format(base_url, region_id, prefecture_id)
+
+
+def _forecast_url(base_url, location_ids, page=''):
+    return (
+        '{base_url}/forecast/'
+        '{region_id}/{prefecture_id}/'
+        '{subprefecture_id}/{city_id}/'
+        '{page}'
+    ).format(
+        base_url=base_url,
+        region_id=location_ids.get('region_id'),
+        prefecture_id=location_ids.get('prefecture_id'),
+        subprefecture_id=location_ids.get('subprefecture_id'),
+        city_id=location_ids.get('city_id'),
+        page=page
+    )
+
+
+def _next_24_hours(raw_forecasts):
+    INTERVAL = 3
+
+    sequence = int(datetime.datetime.now().hour / INTERVAL)
+    today_forecasts = raw_forecasts['today']
+    tomorrow_forecasts = raw_forecasts['tomorrow']
+
+    forecasts = []
+    forecasts.extend(today_forecasts[sequence:])
+    forecasts.extend(tomorrow_forecasts[:sequence])
+
+    return forecasts
+
+
+def _has_data(output):
+    if not output:
+        return False
+
+    if 'update_datetime' in output:
+        return bool(output['update_datetime'])
+
+    if 'today' in output:
+        return any(
+            forecast['weather']
+            for forecasts in output.values()
+            for forecast in forecasts
+        )
+
+    return True
+
+
+def _is_complete(output):
+    # Stricter than _has_data: extractors fall back to empty fields one
+    # section or table at a time, so a page may only be partly read.
+    if not _has_data(output):
+        return False
+
+    if 'city' in output:
+        return bool(output['city']) and all(
+            forecast['weather']
+            for forecast in output['forecasts'].values()
+        )
+
+    if 'today' in output:
+        return all(
+            any(forecast['weather'] for forecast in forecasts)
+            for forecasts in output.values()
+        )
+
+    if 'forecasts' in output:
+        return bool(output['forecasts'])
 
-    return wrapper
+    return True
+
+
+def _http_error(response):
+    try:
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as exception:
+        return exception
+
+    return None
+
+
+def _location_key(location_ids):
+    if isinstance(location_ids, (str, int)):
+        return str(location_ids)
+
+    try:
+        return location_ids.get('city_id')
+    except AttributeError:
+        return None
 
 
 class Scraper:
-    def get_soup(self, url):
+    def __init__(
+            self,
+            transport=None,
+            base_url=BASE_URL,
+            parser=parsing.DEFAULT_PARSER,
+            executor=None,
+            metrics=None
+    ):
+        self.transport = transport if transport is not None else Transport()
+        self.base_url = base_url
+        self.parser = parsing.resolve_parser(parser)
+        # Parsing holds the GIL, so with a ProcessPoolExecutor here the
+        # fetching threads hand the page bytes over to other cores.
+        self.executor = executor
+        # Without metrics, measuring costs a clock read per phase
+        self.metrics = metrics
+        # Fetch failures end up as empty results, so they are kept per
+        # thread: error holds the last failure until _call_raising
+        # reports it, last the failure (or error status) of the latest
+        # fetch until _measure hands it to the metric hooks.
+        self._failures = threading.local()
+
+    def fetch(self, url):
+        response = self._get(url)
+        return None if response is None else response.content
+
+    def get_soup(self, url, parse_only=None):
+        content = self.fetch(url)
+
+        if content is None:
+            return None
+
+        started = time.perf_counter()
+        soup = parsing.make_soup(content, self.parser, parse_only)
+
+        if self.metrics is not None:
+            self.metrics.phase(
+                'parse',
+                url,
+                time.perf_counter() - started,
+                len(content)
+            )
+
+        return soup
+
+    def _get(self, url, **kwargs):
+        started = time.perf_counter()
+        self._failures.last = None
+
         try:
-            content = requests.get(url).content
-            return BeautifulSoup(content, 'html.parser')
-        except requests.exceptions.RequestException:
+            response = self.transport.get(url, **kwargs)
+        except requests.exceptions.RequestException as exception:
+            logger.debug('Failed to fetch %s', url, exc_info=True)
+            self._failures.error = self._failures.last = exception
             return None
 
+        if self.metrics is not None:
+            # Error pages are still parsed, their status only goes along
+            # with the outcome.
+            self._failures.last = _http_error(response)
 
-class LocationScraper(Scraper):
-    @_ignore_exceptions
-    def extract_regions(self):
-        regions = {}
-        soup = self.get_soup('https://tenki.jp')
-        th_tags = (
-            soup
-            .find('table', class_='common-list-entries')
-            .find_all('th')
-        )
+            if not kwargs.get('stream'):
+                self.metrics.fetched(
+                    url,
+                    response,
+                    time.perf_counter() - started
+                )
 
-        for th_tag in th_tags:
-            region_id = th_tag.a['href'].split('/')[-2]
-            regions[region_id] = th_tag.get_text(strip=True)
+        return response
 
-        return regions
+    def _call_raising(self, extractor, *args, **kwargs):
+        # Runs an extractor, raising the fetch failure it swallowed
+        self._failures.error = None
+        output = extractor(*args, **kwargs)
+        error = self._failures.error
 
-    @_ignore_exceptions
-    def extract_prefectures(self, region_id):
-        prefectures = {}
-        url = 'https://tenki.jp/forecast/{}/'.format(region_id)
-        soup = self.get_soup(url)
-        li_tags = (
-            soup
-            .find('table', class_='common-list-entries')
-            .find('tr')
-            .find_all('li')
-        )
+        if error is not None:
+            self._failures.error = None
+            raise error
 
-        for li_tag in li_tags:
-            a_tag = li_tag.find('a', class_='pref-link')
-            prefecture_id = a_tag['href'].split('/')[-2]
-            prefectures[prefecture_id] = a_tag.get_text(strip=True)
+        return output
 
-        return prefectures
+    def _measure(self, url, parse, failed, output, phase, started):
+        if self.metrics is None:
+            return
+
+        if phase is not None:
+            self.metrics.phase(phase, url, time.perf_counter() - started)
+
+        # The failure of the fetch that got (or missed) this page
+        error = getattr(self._failures, 'last', None)
+        self._failures.last = None
+
+        if failed:
+            outcome = 'network_error'
+        elif _is_complete(output):
+            outcome = 'success'
+        else:
+            # The page came, but the extractor missed some of it
+            outcome = 'parse_miss'
+
+        self.metrics.outcome(parse.__name__, url, outcome, error)
+
+    def _scrape(self, url, parse, **kwargs):
+        if self.transport.response_cache is not None:
+            return self._scrape_revalidated(url, parse, **kwargs)
+
+        if self.executor is not None:
+            content = self.fetch(url)
+            started = time.perf_counter()
+            output = self._parse(content, parse, **kwargs)
+            failed = content is None
+            self._measure(url, parse, failed, output, 'parse', started)
+            return output
+
+        soup = self.get_soup(url, parse_only=parse.parse_only)
+        started = time.perf_counter()
+        output = parse(soup, **kwargs)
+        self._measure(url, parse, soup is None, output, 'extract', started)
+        return output
 
-    @_ignore_exceptions
-    def extract_subprefectures_and_cities(self, region_id, prefecture_id):
-        output = {}
-        url = 'https://tenki.jp/forecast/{}/{}/'.format(
-            region_id,
-            prefecture_id
-        )
-        soup = self.get_soup(url)
-        h4_tags = (
-            soup.
-            find_all('h4', class_='forecast-point-city-name')
+    def _parse(self, content, parse, **kwargs):
+        if self.executor is None:
+            return parsing.parse_content(content, parse, self.parser, **kwargs)
+
+        # Only the page bytes are sent to the executor and only the
+        # extracted output comes back; the tree never leaves the worker.
+        return self.executor.submit(
+            parsing.parse_content,
+            content,
+            parse,
+            self.parser,
+            **kwargs
+        ).result()
+
+    def _scrape_revalidated(self, url, parse, **kwargs):
+        # A 304 answered from the response cache can reuse the output
+        # parsed from the same body earlier, skipping the parse.
+        response_cache = self.transport.response_cache
+        response = self._get(url)
+
+        if response is None:
+            output = parse(None, **kwargs)
+            self._measure(url, parse, True, output, None, None)
+            return output
+
+        key = '{}:{}:{}'.format(
+            parse.__name__,
+            self.parser,
+            repr(sorted(kwargs.items()))
         )
-        for h4_tag in h4_tags:
-            # Since subprefecture_id are not really unique,
-            # subprefecture_name is used as dictionary key instead.
-            subprefecture_name = h4_tag.get_text(strip=True)
-            output[subprefecture_name] = {}
-            li_tags = h4_tag.find_next().find_all('li')
-
-            for li_tag in li_tags:
-                splitted_url = li_tag.a['href'].split('/')
-                city_id = splitted_url[-2]
-                subprefecture_id = splitted_url[-3]
-
-                output[subprefecture_name][city_id] = {
-                        'subprefecture_id': subprefecture_id,
-                        'city_name': li_tag.a.get_text(strip=True)
-                }
+
+        if response.from_cache:
+            output = response_cache.load_parsed(url, key, response.digest)
+
+            if output is not None:
+                self._measure(url, parse, False, output, None, None)
+                return output
+
+        started = time.perf_counter()
+        output = self._parse(response.content, parse, **kwargs)
+        self._measure(url, parse, False, output, 'parse', started)
+
+        if response.digest is not None:
+            response_cache.store_parsed(url, key, response.digest, output)
 
         return output
 
 
-class WeatherScraper(Scraper):
-    def extract_forecast_summary(self, location_ids):
-        def _extract_forecast_data(section_tag):
-            try:
-                date = re.search(
-                    r'([0-9]+月[0-9]+日\([日|月|火|水|木|金|土]\))',
-                    section_tag.h3.get_text(strip=True)
-                ).group(1)
-                weather = (
-                    section_tag
-                    .find('p', class_='weather-telop')
-                    .get_text(strip=True)
-                )
-                highest_temperature = '{} {}'.format(
-                    (
-                        section_tag
-                        .find('dd', class_='high-temp temp')
-                        .get_text(strip=True)
-                    ),
-                    (
-                        section_tag
-                        .find('dd', class_='high-temp tempdiff')
-                        .get_text(strip=True)
-                    ),
-                )
-                lowest_temperature = '{} {}'.format(
-                    (
-                        section_tag
-                        .find('dd', class_='low-temp temp')
-                        .get_text(strip=True)
-                    ),
-                    (
-                        section_tag
-                        .find('dd', class_='low-temp tempdiff')
-                        .get_text(strip=True)
-                    ),
-                )
+class LocationScraper(Scraper):
+    def extract_regions(self):
+        return self._scrape(self.base_url, parsing.parse_regions)
+
+    def extract_prefectures(self, region_id):
+        return self._scrape(
+            _prefectures_url(self.base_url, region_id),
+            parsing.parse_prefectures
+        )
 
-                return {
-                    'date': date,
-                    'weather': weather,
-                    'temps': {
-                        'high': highest_temperature,
-                        'low': lowest_temperature
-                    },
-                }
-            except AttributeError:
-                return {
-                    'date': '',
-                    'weather': '',
-                    'temps': {
-                        'high': '',
-                        'low': ''
-                    },
-                }
+    def extract_subprefectures_and_cities(self, region_id, prefecture_id):
+        return self._scrape(
+            _subprefectures_url(self.base_url, region_id, prefecture_id),
+            parsing.parse_subprefectures_and_cities
+        )
 
+
+class WeatherScraper(Scraper):
+    ENGINES = ('soup', 'stream')
+    CHUNK_SIZE = 8 * 1024
+    SNAPSHOT_WORKERS = 8
+
+    def __init__(
+            self,
+            transport=None,
+            base_url=BASE_URL,
+            parser=parsing.DEFAULT_PARSER,
+            engine='soup',
+            cache=None,
+            catalog=None,
+            executor=None,
+            metrics=None,
+            single_flight=None
+    ):
+        super().__init__(transport, base_url, parser, executor, metrics)
+
+        if engine not in self.ENGINES:
+            raise ValueError('Unknown engine: {}'.format(engine))
+
+        self.engine = engine
+        self.cache = cache
+        self.catalog = catalog
+        # A SingleFlight shared by the threads serving a burst of
+        # identical lookups, so that they make one fetch and one parse.
+        self.single_flight = single_flight
+        self._snapshot_executor = None
+        self._snapshot_lock = threading.Lock()
+
+    def _resolve(self, location_ids):
+        # A bare city_id is completed from the catalog. Unknown ones
+        # resolve to None and end up as an empty result.
+        if self.catalog is not None and isinstance(location_ids, (str, int)):
+            return self.catalog.location_ids(location_ids)
+
+        return location_ids
+
+    def _scrape(self, url, parse, **kwargs):
+        if self.single_flight is None:
+            return self._scrape_cached(url, parse, **kwargs)
+
+        # The URL stands for the location_ids it was built from. The
+        # leader raises its fetch failure, so that the callers waiting
+        # on it get the failure as well as the empty result.
         try:
-            url = (
-                'https://tenki.jp/forecast/'
-                '{region_id}/{prefecture_id}/'
-                '{subprefecture_id}/{city_id}/'
-            ).format(
-                region_id=location_ids.get('region_id'),
-                prefecture_id=location_ids.get('prefecture_id'),
-                subprefecture_id=location_ids.get('subprefecture_id'),
-                city_id=location_ids.get('city_id')
+            return self.single_flight.do(
+                (url, parse.__name__, repr(sorted(kwargs.items()))),
+                self._call_raising,
+                self._scrape_cached,
+                url,
+                parse,
+                **kwargs
             )
+        except requests.exceptions.RequestException as exception:
+            self._failures.error = exception
+            return parse(None, **kwargs)
 
-            soup = self.get_soup(url)
+    def _scrape_cached(self, url, parse, **kwargs):
+        if self.cache is None:
+            return self._scrape_page(url, parse, **kwargs)
 
-            h2_tag = soup.find('section', class_='section-wrap').h2
-            update_datetime = (
-                h2_tag
-                .find('time', class_='date-time')
-                .get_text(strip=True)
-                .replace('発表', '')
-            )
+        key = (url, parse.__name__, repr(sorted(kwargs.items())))
+        output = self.cache.get(key)
 
-            # Prevent the original tree from being modified
-            # when calling extract() method
-            h2_tag_copy = copy.copy(h2_tag)
-            h2_tag_copy.time.extract()
-            city = h2_tag_copy.get_text(strip=True).replace('の天気', '')
+        if output is not None and self.metrics is not None:
+            self.metrics.outcome(parse.__name__, url, 'cache_hit')
 
-            today_section = soup.find('section', class_='today-weather')
-            tomorrow_section = soup.find('section', class_='tomorrow-weather')
-        except AttributeError:
-            city = ''
-            update_datetime = ''
-            today_section = None
-            tomorrow_section = None
+        if output is None:
+            output = self._scrape_page(url, parse, **kwargs)
 
-        return {
-            'city': city,
-            'update_datetime': update_datetime,
-            'forecasts': {
-                'today': _extract_forecast_data(today_section),
-                'tomorrow': _extract_forecast_data(tomorrow_section)
-            }
-        }
+            # Failed scrapes are not cached, they would otherwise stick
+            # until the next publish time.
+            if _has_data(output):
+                self.cache.set(key, output, output.get('update_datetime'))
 
-    def extract_3_hourly_forecasts(self, location_ids):
-        def _extract_forecast_data(soup, table_id):
-            forecasts = []
+        return output
 
-            try:
-                table = soup.find('table', id='forecast-point-3h-today')
-                hours = (
-                    table
-                    .find('tr', class_='hour')
-                    .find_all('td')
-                )
-                weathers = (
-                    table
-                    .find('tr', class_='weather')
-                    .find_all('td')
-                )
-                temperatures = (
-                    table
-                    .find('tr', class_='temperature')
-                    .find_all('td')
+    def _discard_cached(self, url):
+        # Forgets every output cached from the page at url
+        if self.cache is not None:
+            self.cache.discard(lambda key: key[0] == url)
+
+    def _scrape_page(self, url, parse, **kwargs):
+        if self.engine == 'soup':
+            return super()._scrape(url, parse, **kwargs)
+
+        return self._stream(url, parse, **kwargs)
+
+    def _stream(self, url, parse, **kwargs):
+        # The stream engine parses while downloading, on the fetching
+        # thread, so the executor is not used. Leaving the block closes
+        # the response, which drops the connection when the parser
+        # stopped before the end of the body.
+        started = time.perf_counter()
+        response = self._get(url, stream=True)
+
+        if response is None:
+            output = parse(None, **kwargs)
+            self._measure(url, parse, True, output, None, None)
+            return output
+
+        try:
+            with response:
+                output = streaming.parse_chunks(
+                    response.iter_content(self.CHUNK_SIZE),
+                    parse,
+                    self.parser,
+                    **kwargs
                 )
+        except requests.exceptions.RequestException as exception:
+            logger.debug('Failed to read %s', url, exc_info=True)
+            self._failures.error = self._failures.last = exception
+            output = parse(None, **kwargs)
+            self._measure(url, parse, True, output, None, None)
+            return output
+
+        self._measure(url, parse, False, output, 'stream', started)
+        return output
 
-                for index, hour in enumerate(hours):
-                    forecasts.append({
-                        'hour': hours[index].get_text(strip=True),
-                        'weather': weathers[index].get_text(strip=True),
-                        'temp': temperatures[index].get_text(strip=True),
-                    })
-            except AttributeError:
-                START_HOUR = 3
-                HOURS_IN_A_DAY = 24
-                INTERVAL = 3
-
-                for hour in range(
-                        START_HOUR,
-                        HOURS_IN_A_DAY + INTERVAL,
-                        INTERVAL
-                ):
-                    forecasts.append({
-                        'hour': str(hour).zfill(2),
-                        'weather': '',
-                        'temp': '',
-                    })
-
-            return forecasts
+    def extract_forecast_summary(self, location_ids):
+        try:
+            url = _forecast_url(self.base_url, self._resolve(location_ids))
+        except AttributeError:
+            return parsing.parse_forecast_summary(None)
+
+        return self._scrape(url, parsing.parse_forecast_summary)
+
+    def extract_3_hourly_forecasts(self, location_ids, extra_rows=()):
+        # Reject unknown rows before anything is fetched
+        parsing.three_hourly_keys(extra_rows)
 
         try:
-            url = (
-                'https://tenki.jp/forecast/'
-                '{region_id}/{prefecture_id}/'
-                '{subprefecture_id}/{city_id}/'
+            url = _forecast_url(
+                self.base_url,
+                self._resolve(location_ids),
                 '3hours.html'
-            ).format(
-                region_id=location_ids.get('region_id'),
-                prefecture_id=location_ids.get('prefecture_id'),
-                subprefecture_id=location_ids.get('subprefecture_id'),
-                city_id=location_ids.get('city_id')
             )
-            soup = self.get_soup(url)
         except AttributeError:
-            soup = None
+            return parsing.parse_3_hourly_forecasts(None, extra_rows)
 
-        return {
-            'today': _extract_forecast_data(
-                soup=soup,
-                table_id='forecast-point-3h-today'
-            ),
-            'tomorrow': _extract_forecast_data(
-                soup=soup,
-                table_id='forecast-point-3h-tomorrow'
+        return self._scrape(
+            url,
+            parsing.parse_3_hourly_forecasts,
+            extra_rows=extra_rows
+        )
+
+    def extract_listing_forecasts(self, region_id=None, prefecture_id=None):
+        # The top, region and prefecture pages carry the weather of
+        # every point they list, so one request covers them all.
+        if region_id is None:
+            url = self.base_url
+        elif prefecture_id is None:
+            url = _prefectures_url(self.base_url, region_id)
+        else:
+            url = _subprefectures_url(self.base_url, region_id, prefecture_id)
+
+        output = self._scrape(url, parsing.parse_listing_forecasts)
+
+        # Points listed on the top and region pages are completed from
+        # the catalog, when there is one.
+        if self.catalog is not None:
+            for city_id, forecast in output['forecasts'].items():
+                if forecast['location_ids'] is None:
+                    forecast['location_ids'] = self.catalog.location_ids(
+                        city_id
+                    )
+
+        return output
+
+    def extract_update_datetime(self, location_ids, page=''):
+        # Reads the forecast page (or e.g. '3hours.html') only as far as
+        # the publish time in its heading, whatever the engine. Closing
+        # the response early costs the connection, which is still much
+        # cheaper than downloading and parsing the whole page.
+        try:
+            url = _forecast_url(
+                self.base_url,
+                self._resolve(location_ids),
+                page
             )
-        }
+        except AttributeError:
+            return ''
+
+        output = self._stream(url, parsing.parse_forecast_header)
+        return output['update_datetime']
+
+    def extract_3_hourly_forecasts_for_next_24_hours(
+            self,
+            location_ids,
+            extra_rows=()
+    ):
+        raw_forecasts = self.extract_3_hourly_forecasts(
+            location_ids,
+            extra_rows
+        )
+        return _next_24_hours(raw_forecasts)
+
+    def extract_city_snapshot(self, location_ids, extra_rows=()):
+        # Both pages are fetched at the same time over the shared pool,
+        # so the latency is that of the slower page rather than the sum.
+        three_hourly_forecasts = self._snapshot_pool().submit(
+            self.extract_3_hourly_forecasts,
+            location_ids,
+            extra_rows
+        )
+        snapshot = self.extract_forecast_summary(location_ids)
+        snapshot['3_hourly_forecasts'] = three_hourly_forecasts.result()
+
+        return snapshot
+
+    def _snapshot_pool(self):
+        # One pool for the lifetime of the scraper, so that sweeping
+        # snapshots reuses its threads instead of starting one per call
+        with self._snapshot_lock:
+            if self._snapshot_executor is None:
+                self._snapshot_executor = (
+                    concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.SNAPSHOT_WORKERS,
+                        thread_name_prefix='tenki-snapshot'
+                    )
+                )
 
-    def extract_3_hourly_forecasts_for_next_24_hours(self, location_ids):
-        INTERVAL = 3
-        raw_forecasts = self.extract_3_hourly_forecasts(location_ids)
+            return self._snapshot_executor
+
+    def extract_forecast_summary_batch(
+            self,
+            locations,
+            max_workers=8,
+            max_in_flight=None
+    ):
+        return self._extract_batch(
+            extractor=self.extract_forecast_summary,
+            locations=locations,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight
+        )
 
-        sequence = int(datetime.datetime.now().hour / INTERVAL)
-        today_forecasts = raw_forecasts['today']
-        tomorrow_forecasts = raw_forecasts['tomorrow']
+    def extract_3_hourly_forecasts_batch(
+            self,
+            locations,
+            max_workers=8,
+            max_in_flight=None
+    ):
+        return self._extract_batch(
+            extractor=self.extract_3_hourly_forecasts,
+            locations=locations,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight
+        )
 
-        forecasts = []
-        forecasts.extend(today_forecasts[sequence:])
-        forecasts.extend(tomorrow_forecasts[:sequence])
+    def iter_forecast_summaries(
+            self,
+            locations,
+            max_workers=8,
+            max_in_flight=None,
+            ordered=False
+    ):
+        return self._iter_forecasts(
+            extractor=self.extract_forecast_summary,
+            locations=locations,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight,
+            ordered=ordered
+        )
 
-        return forecasts
+    def iter_3_hourly_forecasts(
+            self,
+            locations,
+            max_workers=8,
+            max_in_flight=None,
+            ordered=False
+    ):
+        return self._iter_forecasts(
+            extractor=self.extract_3_hourly_forecasts,
+            locations=locations,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight,
+            ordered=ordered
+        )
+
+    def _extract_batch(self, extractor, locations, max_workers, max_in_flight):
+        return {
+            _location_key(record['location_ids']): record
+            for record in self._iter_forecasts(
+                extractor=extractor,
+                locations=locations,
+                max_workers=max_workers,
+                max_in_flight=max_in_flight
+            )
+        }
+
+    def _iter_forecasts(
+            self,
+            extractor,
+            locations,
+            max_workers,
+            max_in_flight,
+            ordered=False
+    ):
+        # Locations are read lazily and every record is handed over as
+        # soon as it is ready, so memory depends on max_in_flight only
+        # and not on how many locations are swept. A city that could not
+        # be fetched gets its error rather than an empty forecast.
+        for location_ids, forecast, exception in bounded_map(
+                function=functools.partial(self._call_raising, extractor),
+                items=locations,
+                max_workers=max_workers,
+                max_in_flight=max_in_flight,
+                ordered=ordered
+        ):
+            yield {
+                'location_ids': location_ids,
+                'forecast': forecast,
+                'error': exception,
+            }
@@ -0,0 +1,180 @@
+import bisect
+import re
+import unicodedata
+
+_ROMAJI = dict(zip(
+    'あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほ'
+    'まみむめもやゆよらりるれろわをんがぎぐげござじずぜぞだぢづでど'
+    'ばびぶべぼぱぴぷぺぽぁぃぅぇぉ',
+    (
+        'a i u e o ka ki ku ke ko sa shi su se so ta chi tsu te to '
+        'na ni nu ne no ha hi fu he ho ma mi mu me mo ya yu yo '
+        'ra ri ru re ro wa o n ga gi gu ge go za ji zu ze zo '
+        'da ji zu de do ba bi bu be bo pa pi pu pe po a i u e o'
+    ).split()
+))
+_SMALL_Y = {'ゃ': 'a', 'ゅ': 'u', 'ょ': 'o'}
+_LONG_VOWELS = re.compile(r'(?<=o)[ou]|(?<=u)u')
+
+
+def normalize(text):
+    # Full width letters, case and katakana are folded, so that
+    # 'Chiyoda', 'ｃｈｉｙｏｄａ' and 'チヨダ' meet 'chiyoda' and 'ちよだ'.
+    text = unicodedata.normalize('NFKC', text).lower()
+
+    return ''.join(
+        chr(ord(character) - 0x60) if 'ァ' <= character <= 'ヶ'
+        else character
+        for character in text
+        if not character.isspace()
+    )
+
+
+def romanize(reading):
+    # Hepburn-like romanization of a kana reading. Long vowels are
+    # dropped as well, as in 'tokyo' for 'とうきょう'.
+    reading = normalize(reading)
+    pieces = []
+    double = False
+
+    for character in reading:
+        if character == 'っ':
+            double = True
+            continue
+
+        if character in _SMALL_Y and pieces:
+            base = pieces.pop()[:-1]
+
+            if base in ('sh', 'ch', 'j'):
+                piece = base + _SMALL_Y[character]
+            else:
+                piece = base + 'y' + _SMALL_Y[character]
+        else:
+            piece = _ROMAJI.get(character, '' if character == 'ー' else None)
+
+            if piece is None:
+                return None
+
+        if double and piece:
+            piece = piece[0] + piece
+            double = False
+
+        pieces.append(piece)
+
+    return _LONG_VOWELS.sub('', ''.join(pieces))
+
+
+def prefix_distance(query, key, max_distance):
+    # Levenshtein distance between query and the closest prefix of key,
+    # so that a misspelt beginning of a name still matches. Gives up as
+    # soon as every path exceeds max_distance.
+    previous = list(range(len(key) + 1))
+
+    for i, query_character in enumerate(query, 1):
+        current = [i]
+
+        for j, key_character in enumerate(key, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (query_character != key_character),
+            ))
+
+        if min(current) > max_distance:
+            return max_distance + 1
+
+        previous = current
+
+    return min(previous)
+
+
+class CityIndex:
+    # Sorted array prefix index over city names and, when given, their
+    # kana readings and the romanization of those. Every key points to
+    # the position of a city, so cities sharing a name (e.g. 府中市 in
+    # Tokyo and Hiroshima) are all returned, with their prefecture.
+    def __init__(self, cities, readings=None):
+        readings = readings or {}
+        self.cities = list(cities)
+        entries = set()
+
+        for position, city in enumerate(self.cities):
+            keys = {normalize(city['city_name'])}
+            reading = readings.get(city['city_id'])
+
+            if reading:
+                keys.add(normalize(reading))
+                romaji = romanize(reading)
+
+                if romaji:
+                    keys.add(romaji)
+
+            entries.update((key, position) for key in keys if key)
+
+        entries = sorted(entries)
+        self._keys = [key for key, _ in entries]
+        self._positions = [position for _, position in entries]
+
+    def __len__(self):
+        return len(self.cities)
+
+    def complete(self, prefix, limit=10):
+        prefix = normalize(prefix)
+
+        if not prefix:
+            return []
+
+        start = bisect.bisect_left(self._keys, prefix)
+        stop = bisect.bisect_left(self._keys, prefix + '\U0010ffff')
+
+        return self._cities(self._positions[start:stop], limit)
+
+    def search(self, query, limit=10, max_distance=None):
+        # Prefix matches come first; only when there are none, the
+        # keys starting within max_distance edits of the query are
+        # returned, nearest first.
+        output = self.complete(query, limit)
+
+        if output:
+            return output
+
+        query = normalize(query)
+
+        if not query:
+            return []
+
+        if max_distance is None:
+            max_distance = 1 if len(query) < 5 else 2
+
+        matches = []
+
+        for key, position in zip(self._keys, self._positions):
+            distance = prefix_distance(
+                query,
+                key[:len(query) + max_distance],
+                max_distance
+            )
+
+            if distance <= max_distance:
+                matches.append((distance, key, position))
+
+        return self._cities(
+            [position for _, _, position in sorted(matches)],
+            limit
+        )
+
+    def _cities(self, positions, limit):
+        seen = set()
+        output = []
+
+        for position in positions:
+            if position in seen:
+                continue
+
+            seen.add(position)
+            output.append(self.cities[position])
+
+            if len(output) == limit:
+                break
+
+        return output
@@ -0,0 +1,373 @@
+import codecs
+import html.parser
+
+from . import parsing
+
+
+class _StopParsing(Exception):
+    pass
+
+
+def _matches(attrs, class_):
+    # Same semantics as BeautifulSoup's class_ argument: either the
+    # whole attribute value or one of its classes has to match.
+    if class_ is None:
+        return True
+
+    value = attrs.get('class') or ''
+    return class_ == value or class_ in value.split()
+
+
+class _StreamParser(html.parser.HTMLParser):
+    # Collects the text of selected elements in a single pass without
+    # building a tree. Subclasses open captures in start() and receive
+    # the stripped text of each closed capture in end(); raising
+    # _StopParsing from either ends the pass early.
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.done = False
+        self.failed = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._pending = []
+        self._captures = []
+
+    def feed_bytes(self, chunk):
+        if self.done or self.failed:
+            return self.done
+
+        try:
+            self.feed(self._decoder.decode(chunk))
+        except UnicodeDecodeError:
+            self.failed = True
+
+        return self.done
+
+    def feed(self, data):
+        if self.done:
+            return
+
+        try:
+            super().feed(data)
+        except _StopParsing:
+            self.done = True
+
+    def close(self):
+        if self.done:
+            return
+
+        try:
+            super().close()
+        except _StopParsing:
+            self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+
+        for capture in self._captures:
+            if capture[0] == tag:
+                capture[1] += 1
+
+        self.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self._flush()
+
+        for capture in reversed(self._captures):
+            if capture[0] == tag:
+                capture[1] -= 1
+
+        while self._captures and self._captures[-1][1] == 0:
+            _, _, key, pieces = self._captures.pop()
+            self.end(key, ''.join(pieces))
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def capture(self, tag, key):
+        self._captures.append([tag, 1, key, []])
+
+    def capturing(self, key):
+        return any(capture[2] == key for capture in self._captures)
+
+    def start(self, tag, attrs):
+        raise NotImplementedError
+
+    def end(self, key, text):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+    def _flush(self):
+        # Text is only stripped once a whole text node has been seen,
+        # since a node may arrive split over several chunks.
+        if not self._pending:
+            return
+
+        text = ''.join(self._pending).strip()
+        self._pending = []
+
+        if text and self._captures:
+            self._captures[-1][3].append(text)
+
+
+class ForecastSummaryParser(_StreamParser):
+    SECTIONS = {
+        'today-weather': 'today',
+        'tomorrow-weather': 'tomorrow',
+    }
+    FIELDS = [
+        ('h3', None, 'date'),
+        ('p', 'weather-telop', 'weather'),
+        ('dd', 'high-temp temp', 'high_temp'),
+        ('dd', 'high-temp tempdiff', 'high_tempdiff'),
+        ('dd', 'low-temp temp', 'low_temp'),
+        ('dd', 'low-temp tempdiff', 'low_tempdiff'),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        self.values = {}
+        self._section = None
+        self._closed_sections = set()
+
+    def start(self, tag, attrs):
+        if tag == 'h2' and 'city' not in self.values:
+            if not self.capturing('city'):
+                self.capture(tag, 'city')
+        elif tag == 'time' and self.capturing('city'):
+            if _matches(attrs, 'date-time'):
+                self.capture(tag, 'update_datetime')
+        elif tag == 'section' and self._section is None:
+            for class_, section in self.SECTIONS.items():
+                if section in self._closed_sections:
+                    continue
+
+                if _matches(attrs, class_):
+                    self._section = section
+                    self.capture(tag, section)
+                    break
+        elif self._section is not None:
+            for field_tag, class_, field in self.FIELDS:
+                key = (self._section, field)
+
+                if (
+                        tag == field_tag
+                        and key not in self.values
+                        and not self.capturing(key)
+                        and _matches(attrs, class_)
+                ):
+                    self.capture(tag, key)
+                    break
+
+    def end(self, key, text):
+        if key in self.SECTIONS.values():
+            self._section = None
+            self._closed_sections.add(key)
+
+            if len(self._closed_sections) == len(self.SECTIONS):
+                raise _StopParsing
+        else:
+            self.values.setdefault(key, text)
+
+    def result(self):
+        try:
+            forecasts = {
+                section: self._forecast_data(section)
+                for section in self.SECTIONS.values()
+            }
+
+            return {
+                'city': self.values['city'].replace('の天気', ''),
+                'update_datetime': (
+                    self.values['update_datetime'].replace('発表', '')
+                ),
+                'forecasts': forecasts,
+            }
+        except (AttributeError, KeyError):
+            return None
+
+    def _forecast_data(self, section):
+        values = {
+            field: self.values[(section, field)]
+            for _, _, field in self.FIELDS
+        }
+
+        return {
+            'date': parsing.DATE_PATTERN.search(values['date']).group(1),
+            'weather': values['weather'],
+            'temps': {
+                'high': '{} {}'.format(
+                    values['high_temp'],
+                    values['high_tempdiff']
+                ),
+                'low': '{} {}'.format(
+                    values['low_temp'],
+                    values['low_tempdiff']
+                ),
+            },
+        }
+
+
+class ThreeHourlyForecastParser(_StreamParser):
+    def __init__(self, extra_rows=()):
+        super().__init__()
+        self.keys = parsing.three_hourly_keys(extra_rows)
+        self.tables = {}
+        self._table = None
+        self._row = None
+
+    def start(self, tag, attrs):
+        if tag == 'table' and self._table is None:
+            table_id = attrs.get('id')
+
+            if (
+                    table_id in parsing.THREE_HOURLY_TABLES
+                    and table_id not in self.tables
+            ):
+                self._table = table_id
+                self.tables[table_id] = {}
+                self.capture(tag, 'table')
+        elif tag == 'tr' and self._table is not None and self._row is None:
+            rows = self.tables[self._table]
+
+            for class_ in (attrs.get('class') or '').split():
+                row = parsing.THREE_HOURLY_ROWS.get(class_)
+
+                if row in self.keys and row not in rows:
+                    self._row = row
+                    rows[row] = []
+                    self.capture(tag, 'row')
+                    break
+        elif tag == 'td' and self._row is not None:
+            self.capture(tag, 'cell')
+
+    def end(self, key, text):
+        if key == 'cell':
+            self.tables[self._table][self._row].append(text)
+        elif key == 'row':
+            self._row = None
+        elif key == 'table':
+            self._table = None
+
+            if all(
+                    table_id in self.tables
+                    for table_id in parsing.THREE_HOURLY_TABLES
+            ):
+                raise _StopParsing
+
+    def result(self):
+        def _extract_forecast_data(table_id):
+            rows = self.tables[table_id]
+            hours = rows['hour']
+
+            if not hours or any(
+                    len(rows[key]) != len(hours)
+                    for key in self.keys
+            ):
+                raise KeyError(table_id)
+
+            return [
+                {key: rows[key][index] for key in self.keys}
+                for index in range(len(hours))
+            ]
+
+        try:
+            return {
+                'today': _extract_forecast_data(
+                    table_id='forecast-point-3h-today'
+                ),
+                'tomorrow': _extract_forecast_data(
+                    table_id='forecast-point-3h-tomorrow'
+                ),
+            }
+        except KeyError:
+            return None
+
+
+class ForecastHeaderParser(_StreamParser):
+    # Stops right after the publish time in the page heading, so the
+    # rest of the page need not be downloaded.
+    def __init__(self):
+        super().__init__()
+        self.update_datetime = None
+
+    def start(self, tag, attrs):
+        if tag == 'h2' and not self.capturing('h2'):
+            self.capture(tag, 'h2')
+        elif tag == 'time' and self.capturing('h2'):
+            if _matches(attrs, 'date-time'):
+                self.capture(tag, 'update_datetime')
+
+    def end(self, key, text):
+        if key == 'update_datetime':
+            self.update_datetime = text
+            raise _StopParsing
+
+    def result(self):
+        if self.update_datetime is None:
+            return None
+
+        return {'update_datetime': self.update_datetime.replace('発表', '')}
+
+
+STREAM_PARSERS = {
+    parsing.parse_forecast_summary: ForecastSummaryParser,
+    parsing.parse_3_hourly_forecasts: ThreeHourlyForecastParser,
+    parsing.parse_forecast_header: ForecastHeaderParser,
+}
+
+
+def parse_chunks(chunks, parse, parser=parsing.DEFAULT_PARSER, **kwargs):
+    # Consumes chunks only until the stream parser has everything it
+    # needs, so the caller can drop the rest of the download. Whenever
+    # a marker is missing, the remaining chunks are read after all and
+    # the tree based extractor gets the whole page.
+    if parse not in STREAM_PARSERS:
+        return parsing.parse_content(
+            b''.join(chunks),
+            parse,
+            parser,
+            **kwargs
+        )
+
+    chunks = iter(chunks)
+    received = []
+    stream_parser = STREAM_PARSERS[parse](**kwargs)
+
+    for chunk in chunks:
+        received.append(chunk)
+
+        if stream_parser.feed_bytes(chunk):
+            break
+    else:
+        stream_parser.close()
+
+    output = None if stream_parser.failed else stream_parser.result()
+
+    if output is None:
+        received.extend(chunks)
+        return parsing.parse_content(
+            b''.join(received),
+            parse,
+            parser,
+            **kwargs
+        )
+
+    return output
+
+
+def parse_content(content, parse, parser=parsing.DEFAULT_PARSER, **kwargs):
+    if content is None:
+        return parse(None, **kwargs)
+
+    return parse_chunks([content], parse, parser, **kwargs)
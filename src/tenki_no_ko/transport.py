@@ -0,0 +1,149 @@
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class Transport:
+    def __init__(
+            self,
+            pool_connections=10,
+            pool_maxsize=10,
+            connect_timeout=3.05,
+            read_timeout=10,
+            retries=3,
+            backoff_factor=0.3,
+            status_forcelist=(500, 502, 503, 504),
+            session=None,
+            response_cache=None,
+            limiter=None
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = session if session is not None else requests.Session()
+        self.response_cache = response_cache
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_statuses = frozenset(status_forcelist) | {429}
+
+        # With a limiter, throttled and failed responses are retried by
+        # get rather than inside the adapter, so that the limiter sees
+        # every one of them.
+        respect_retry_after_header = limiter is None
+
+        if limiter is not None:
+            status_forcelist = ()
+
+        # Connection errors and resets are retried through the
+        # connect/read counters, server errors through status_forcelist.
+        max_retries = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+            respect_retry_after_header=respect_retry_after_header
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+
+        if self.limiter is not None:
+            return self._get_limited(url, **kwargs)
+
+        return self._get(url, **kwargs)
+
+    def _get(self, url, **kwargs):
+        # Streamed responses may be abandoned half way, so they are
+        # never stored.
+        if self.response_cache is None or kwargs.get('stream'):
+            return self.session.get(url, **kwargs)
+
+        return self._get_revalidated(url, **kwargs)
+
+    def _get_limited(self, url, **kwargs):
+        for attempt in range(self.retries + 1):
+            ticket = self.limiter.acquire(url)
+            started = time.monotonic()
+
+            try:
+                response = self._get(url, **kwargs)
+            except requests.exceptions.RequestException:
+                self.limiter.release(
+                    url,
+                    ticket,
+                    None,
+                    time.monotonic() - started
+                )
+                raise
+
+            retry_after = response.headers.get('Retry-After')
+            self.limiter.release(
+                url,
+                ticket,
+                response.status_code,
+                time.monotonic() - started,
+                retry_after
+            )
+
+            if response.status_code not in self.retry_statuses:
+                return response
+
+            # Out of retries the error page must not pass for a page,
+            # so fail like the adapter does once its retries ran out.
+            if attempt == self.retries:
+                response.raise_for_status()
+
+            response.close()
+
+            # A Retry-After is waited out by the limiter, for all the
+            # requests to the host.
+            if retry_after is None:
+                time.sleep(self.backoff_factor * 2 ** attempt)
+
+    def _get_revalidated(self, url, **kwargs):
+        entry = self.response_cache.load(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+
+        if entry is not None:
+            if entry['etag'] is not None:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified'] is not None:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.session.get(url, headers=headers, **kwargs)
+        response.from_cache = False
+        response.digest = None
+
+        if response.status_code == 304 and entry is not None:
+            response.status_code = 200
+            response._content = entry['body']
+            response.from_cache = True
+            response.digest = entry['digest']
+        elif response.status_code == 200:
+            response.digest = self.response_cache.store(
+                url,
+                response.content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,5 +1,9 @@
 import os
 import datetime
+import hashlib
+import http.server
+import threading
+import time
 
 import pytest
 
@@ -7,6 +11,87 @@ from tenki_no_ko import LocationScraper
 from tenki_no_ko import Scraper
 from tenki_no_ko import WeatherScraper
 
+# Paths served by the local stand-in servers, mirroring tenki.jp
+FIXTURE_PAGES = {
+    '/': 'index.html',
+    '/forecast/3/': 'prefecture.html',
+    '/forecast/3/16/': 'subprefecture.html',
+    '/forecast/3/16/4410/13101/': 'forecast_summary.html',
+    '/forecast/3/16/4410/13101/3hours.html': '3_hourly_forecast.html',
+}
+
+
+class FixtureRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+
+        try:
+            self._respond(server)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _respond(self, server):
+        time.sleep(server.latency)
+
+        # Answer the next server.throttle requests with a 429 (or
+        # server.throttle_status), as a rate limiting site would
+        with server.lock:
+            throttled = server.throttle > 0
+            server.throttle -= throttled
+
+        if throttled:
+            self.send_response(server.throttle_status)
+
+            if server.retry_after is not None:
+                self.send_header('Retry-After', str(server.retry_after))
+
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.path not in server.pages:
+            self.send_error(404)
+            return
+
+        content = server.pages[self.path]
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:16])
+
+        if server.etags and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        chunk_size = server.chunk_size or len(content)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+
+        if server.etags:
+            self.send_header('ETag', etag)
+
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+
+        try:
+            for offset in range(0, len(content), chunk_size):
+                self.wfile.write(content[offset:offset + chunk_size])
+                self.wfile.flush()
+                server.sent[self.path] = offset + chunk_size
+                time.sleep(server.delay)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
 
 def test_file(filename):
     path = os.path.join(
@@ -75,3 +160,35 @@ def location_scraper(mocker):
 @pytest.fixture
 def weather_scraper(mocker):
     return WeatherScraper()
+
+
+@pytest.fixture
+def fixture_server():
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0),
+        FixtureRequestHandler
+    )
+    server.daemon_threads = True
+    server.pages = {
+        path: test_file(filename).encode('utf-8')
+        for path, filename in FIXTURE_PAGES.items()
+    }
+    server.chunk_size = None
+    server.etags = False
+    server.delay = 0
+    server.latency = 0
+    server.requests = []
+    server.sent = {}
+    server.lock = threading.Lock()
+    server.active = 0
+    server.max_active = 0
+    server.throttle = 0
+    server.throttle_status = 429
+    server.retry_after = None
+    server.base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
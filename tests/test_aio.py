@@ -0,0 +1,197 @@
+import asyncio
+
+import pytest
+from bs4 import BeautifulSoup
+
+import conftest
+from tenki_no_ko import AsyncSingleFlight
+from tenki_no_ko import parsing
+
+aiohttp = pytest.importorskip('aiohttp')
+web = pytest.importorskip('aiohttp.web')
+aio = pytest.importorskip('tenki_no_ko.aio')
+
+
+def _run_with_server(coroutine_function, delay=0):
+    pages = {
+        path: conftest.test_file(filename).encode('utf-8')
+        for path, filename in conftest.FIXTURE_PAGES.items()
+    }
+    state = {'in_flight': 0, 'peak': 0, 'requests': 0}
+
+    async def _handler(request):
+        state['requests'] += 1
+
+        if request.path not in pages:
+            raise web.HTTPNotFound()
+
+        state['in_flight'] += 1
+        state['peak'] = max(state['peak'], state['in_flight'])
+        await asyncio.sleep(delay)
+        state['in_flight'] -= 1
+
+        return web.Response(
+            body=pages[request.path],
+            content_type='text/html'
+        )
+
+    async def _main():
+        app = web.Application()
+        app.router.add_get('/{path:.*}', _handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+
+        try:
+            return await coroutine_function(
+                'http://127.0.0.1:{}'.format(port)
+            ), state
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(_main())
+
+
+def _parse(filename, parse):
+    html = conftest.test_file(filename).encode('utf-8')
+    return parse(BeautifulSoup(html, 'html.parser'))
+
+
+def test_async_location_scraper():
+    async def _scrape(base_url):
+        async with aio.AsyncLocationScraper(base_url=base_url) as scraper:
+            return await asyncio.gather(
+                scraper.extract_regions(),
+                scraper.extract_prefectures(region_id=3),
+                scraper.extract_subprefectures_and_cities(
+                    region_id=3,
+                    prefecture_id=16
+                ),
+            )
+
+    (regions, prefectures, cities), _ = _run_with_server(_scrape)
+
+    assert regions == _parse('index.html', parsing.parse_regions)
+    assert prefectures == _parse(
+        'prefecture.html',
+        parsing.parse_prefectures
+    )
+    assert cities == _parse(
+        'subprefecture.html',
+        parsing.parse_subprefectures_and_cities
+    )
+
+
+def test_async_weather_scraper(location_ids):
+    async def _scrape(base_url):
+        async with aio.AsyncWeatherScraper(base_url=base_url) as scraper:
+            return await asyncio.gather(
+                scraper.extract_forecast_summary(location_ids),
+                scraper.extract_3_hourly_forecasts(location_ids),
+            )
+
+    (summary, three_hourly), _ = _run_with_server(_scrape)
+
+    assert summary == _parse(
+        'forecast_summary.html',
+        parsing.parse_forecast_summary
+    )
+    assert summary['city'] == '千代田区'
+    assert three_hourly == _parse(
+        '3_hourly_forecast.html',
+        parsing.parse_3_hourly_forecasts
+    )
+
+
+def test_async_extract_city_snapshot(location_ids):
+    async def _scrape(base_url):
+        async with aio.AsyncWeatherScraper(base_url=base_url) as scraper:
+            return await scraper.extract_city_snapshot(location_ids)
+
+    snapshot, _ = _run_with_server(_scrape)
+    expected = _parse(
+        'forecast_summary.html',
+        parsing.parse_forecast_summary
+    )
+    expected['3_hourly_forecasts'] = _parse(
+        '3_hourly_forecast.html',
+        parsing.parse_3_hourly_forecasts
+    )
+
+    assert snapshot == expected
+
+
+def test_async_extract_listing_forecasts():
+    async def _scrape(base_url):
+        async with aio.AsyncWeatherScraper(base_url=base_url) as scraper:
+            return await scraper.extract_listing_forecasts('3', '16')
+
+    output, _ = _run_with_server(_scrape)
+
+    assert output == _parse(
+        'subprefecture.html',
+        parsing.parse_listing_forecasts
+    )
+
+
+def test_async_weather_scraper_with_unknown_location(location_ids):
+    async def _scrape(base_url):
+        async with aio.AsyncWeatherScraper(base_url=base_url) as scraper:
+            return await asyncio.gather(
+                scraper.extract_forecast_summary(None),
+                scraper.extract_forecast_summary(
+                    dict(location_ids, city_id='99999')
+                ),
+            )
+
+    (unknown, missing), _ = _run_with_server(_scrape)
+
+    assert unknown == parsing.parse_forecast_summary(None)
+    assert missing == parsing.parse_forecast_summary(None)
+
+
+def test_async_scraper_limits_concurrency():
+    async def _scrape(base_url):
+        async with aio.AsyncScraper(
+                base_url=base_url,
+                max_concurrency=3
+        ) as scraper:
+            return await asyncio.gather(*[
+                scraper.fetch(base_url + '/') for _ in range(12)
+            ])
+
+    contents, state = _run_with_server(_scrape, delay=0.01)
+
+    assert len(contents) == 12
+    assert all(content is not None for content in contents)
+    assert state['peak'] <= 3
+
+
+def test_async_weather_scraper_coalesces_identical_lookups(location_ids):
+    single_flight = AsyncSingleFlight()
+
+    async def _scrape(base_url):
+        async with aio.AsyncWeatherScraper(
+                base_url=base_url,
+                single_flight=single_flight
+        ) as scraper:
+            return await asyncio.gather(*[
+                scraper.extract_forecast_summary(location_ids)
+                for _ in range(10)
+            ])
+
+    outputs, state = _run_with_server(_scrape, delay=0.05)
+
+    assert all(output['city'] == '千代田区' for output in outputs)
+    assert state['requests'] == 1
+    assert single_flight.stats()['coalesced'] == 9
+
+
+def test_failed_to_fetch():
+    async def _fetch():
+        async with aio.AsyncScraper(connect_timeout=0.5) as scraper:
+            return await scraper.get_soup('http://127.0.0.1:9/')
+
+    assert asyncio.run(_fetch()) is None
@@ -0,0 +1,131 @@
+import datetime
+import os
+
+import pytest
+
+from tenki_no_ko import PageArchive
+from tenki_no_ko import RecordingTransport
+from tenki_no_ko import ReplayTransport
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko import parsing
+from tenki_no_ko.archive import NotArchived
+
+URL = 'http://tenki.invalid/'
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = PageArchive(str(tmp_path / 'archive'))
+    yield archive
+    archive.close()
+
+
+def test_archive_round_trip(archive, forecast_summary_html):
+    archive.append(
+        URL,
+        forecast_summary_html,
+        headers={'Content-Type': 'text/html; charset=utf-8'},
+        fetched=100
+    )
+    entry = archive.load(URL)
+
+    assert entry['content'] == forecast_summary_html
+    assert entry['status_code'] == 200
+    assert entry['fetched'] == 100
+    assert entry['headers'] == {'Content-Type': 'text/html; charset=utf-8'}
+    assert archive.load('http://other.invalid/') is None
+    assert URL in archive
+    assert len(archive) == 1
+
+    # Pages are stored compressed
+    data_size = os.path.getsize(os.path.join(archive.directory, 'pages.dat'))
+    assert data_size < len(forecast_summary_html) / 3
+
+
+def test_archive_loads_pages_as_fetched_at(archive):
+    archive.append(URL, b'second', fetched=200)
+    archive.append(URL, b'first', fetched=100)
+    archive.append(URL, b'third', fetched=300)
+
+    assert archive.fetch_times(URL) == [100, 200, 300]
+    assert archive.load(URL)['content'] == b'third'
+    assert archive.load(URL, at=250)['content'] == b'second'
+    assert archive.load(URL, at=200)['content'] == b'second'
+    assert archive.load(URL, at=99) is None
+    assert archive.load(
+        URL,
+        at=datetime.datetime.fromtimestamp(150, datetime.timezone.utc)
+    )['content'] == b'first'
+
+
+def test_archive_persists(tmp_path):
+    directory = str(tmp_path / 'archive')
+
+    with PageArchive(directory) as archive:
+        archive.append(URL, b'page', fetched=100)
+
+    # A crash may leave a partial index line behind
+    with open(os.path.join(directory, 'pages.idx'), 'a') as f:
+        f.write('{"url": "http://')
+
+    with PageArchive(directory) as archive:
+        assert archive.urls() == [URL]
+        assert archive.load(URL)['content'] == b'page'
+
+        archive.append(URL, b'page again', fetched=200)
+        assert archive.load(URL)['content'] == b'page again'
+
+
+def test_record_and_replay(fixture_server, location_ids, archive):
+    recording_scraper = WeatherScraper(
+        transport=RecordingTransport(archive),
+        base_url=fixture_server.base_url
+    )
+    summary = recording_scraper.extract_forecast_summary(location_ids)
+    three_hourly = recording_scraper.extract_3_hourly_forecasts(location_ids)
+    fixture_server.requests.clear()
+
+    for engine in WeatherScraper.ENGINES:
+        replay_scraper = WeatherScraper(
+            transport=ReplayTransport(archive),
+            base_url=fixture_server.base_url,
+            engine=engine
+        )
+
+        assert replay_scraper.extract_forecast_summary(
+            location_ids
+        ) == summary
+        assert replay_scraper.extract_3_hourly_forecasts(
+            location_ids
+        ) == three_hourly
+
+    assert fixture_server.requests == []
+    assert len(archive) == 2
+
+
+def test_record_streamed_pages(fixture_server, location_ids, archive):
+    weather_scraper = WeatherScraper(
+        transport=RecordingTransport(archive),
+        base_url=fixture_server.base_url,
+        engine='stream'
+    )
+    summary = weather_scraper.extract_forecast_summary(location_ids)
+
+    url = fixture_server.base_url + '/forecast/3/16/4410/13101/'
+    assert summary['city'] == '千代田区'
+    assert archive.load(url)['content'] == fixture_server.pages[
+        '/forecast/3/16/4410/13101/'
+    ]
+
+
+def test_replay_missing_pages(archive, location_ids):
+    transport = ReplayTransport(archive)
+
+    with pytest.raises(NotArchived):
+        transport.get(URL)
+
+    weather_scraper = WeatherScraper(transport=transport, base_url=URL)
+
+    assert weather_scraper.extract_forecast_summary(
+        location_ids
+    ) == parsing.parse_forecast_summary(None)
@@ -0,0 +1,262 @@
+import concurrent.futures
+import datetime
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from tenki_no_ko import ForecastCache
+from tenki_no_ko import ResponseCache
+from tenki_no_ko import Transport
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko import parsing
+from tenki_no_ko.cache import JST
+from tenki_no_ko.cache import next_publish_time
+from tenki_no_ko.cache import parse_update_datetime
+from tenki_no_ko.scraper import BASE_URL
+from tenki_no_ko.scraper import _forecast_url
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock(datetime.datetime(2020, 8, 20, 9, 0, tzinfo=JST))
+
+
+def test_parse_update_datetime():
+    now = datetime.datetime(2020, 8, 20, 9, 0, tzinfo=JST)
+
+    assert parse_update_datetime('20日06:00', now) == datetime.datetime(
+        2020, 8, 20, 6, 0, tzinfo=JST
+    )
+    assert parse_update_datetime('31日17:00', now) == datetime.datetime(
+        2020, 7, 31, 17, 0, tzinfo=JST
+    )
+    assert parse_update_datetime('', now) is None
+
+
+def test_next_publish_time():
+    assert next_publish_time(
+        datetime.datetime(2020, 8, 20, 6, 0, tzinfo=JST)
+    ) == datetime.datetime(2020, 8, 20, 11, 0, tzinfo=JST)
+    assert next_publish_time(
+        datetime.datetime(2020, 8, 20, 17, 0, tzinfo=JST)
+    ) == datetime.datetime(2020, 8, 21, 5, 0, tzinfo=JST)
+
+
+def test_cache_expires_at_next_publish_time(clock):
+    cache = ForecastCache(clock=clock)
+    cache.set('key', {'value': 1}, update_datetime='20日06:00')
+
+    assert cache.get('key') == {'value': 1}
+
+    clock.now = datetime.datetime(2020, 8, 20, 10, 59, tzinfo=JST)
+    assert cache.get('key') == {'value': 1}
+
+    clock.now = datetime.datetime(2020, 8, 20, 11, 0, tzinfo=JST)
+    assert cache.get('key') is None
+    assert cache.stats() == {
+        'entries': 0,
+        'bytes': 0,
+        'hits': 2,
+        'misses': 1,
+        'evictions': 0,
+        'expirations': 1,
+    }
+
+
+def test_cache_keeps_late_pages_for_min_ttl(clock):
+    cache = ForecastCache(min_ttl=600, clock=clock)
+    cache.set('key', 'value', update_datetime='19日17:00')
+
+    clock.now += datetime.timedelta(seconds=599)
+    assert cache.get('key') == 'value'
+
+    clock.now += datetime.timedelta(seconds=1)
+    assert cache.get('key') is None
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = ForecastCache(max_entries=2, clock=clock)
+    cache.set('a', 'a')
+    cache.set('b', 'b')
+    cache.get('a')
+    cache.set('c', 'c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'a'
+    assert cache.get('c') == 'c'
+    assert cache.evictions == 1
+
+
+def test_cache_is_bounded_by_bytes(clock):
+    cache = ForecastCache(max_bytes=1000, clock=clock)
+
+    for index in range(10):
+        cache.set(index, 'x' * 200)
+
+    assert cache.size <= 1000
+    assert 0 < len(cache) < 10
+    assert cache.get(9) == 'x' * 200
+
+
+def test_cache_returns_copies(clock):
+    cache = ForecastCache(clock=clock)
+    cache.set('key', {'value': [1]})
+    cache.get('key')['value'].append(2)
+
+    assert cache.get('key') == {'value': [1]}
+
+
+def test_weather_scraper_with_cache(
+        mocker,
+        clock,
+        forecast_summary_html,
+        location_ids
+):
+    weather_scraper = WeatherScraper(cache=ForecastCache(clock=clock))
+    mock_get_soup = mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        return_value=BeautifulSoup(forecast_summary_html, 'html.parser')
+    )
+    output = weather_scraper.extract_forecast_summary(location_ids)
+
+    assert weather_scraper.extract_forecast_summary(location_ids) == output
+    assert mock_get_soup.call_count == 1
+    assert weather_scraper.cache.hits == 1
+
+    clock.now = datetime.datetime(2020, 8, 20, 11, 0, tzinfo=JST)
+    weather_scraper.extract_forecast_summary(location_ids)
+
+    assert mock_get_soup.call_count == 2
+
+
+def test_weather_scraper_does_not_cache_failures(
+        mocker,
+        clock,
+        location_ids
+):
+    weather_scraper = WeatherScraper(cache=ForecastCache(clock=clock))
+    mock_get_soup = mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        return_value=None
+    )
+    weather_scraper.extract_forecast_summary(location_ids)
+    weather_scraper.extract_3_hourly_forecasts(location_ids)
+    weather_scraper.extract_forecast_summary(location_ids)
+
+    assert mock_get_soup.call_count == 3
+    assert len(weather_scraper.cache) == 0
+
+
+def _store_and_load(directory, index):
+    response_cache = ResponseCache(directory)
+    body = str(index).encode('utf-8') * 1024
+    response_cache.store('https://tenki.jp/', body, etag=str(index))
+    entry = response_cache.load('https://tenki.jp/')
+
+    return entry['body'] == entry['etag'].encode('utf-8') * 1024
+
+
+def test_response_cache_requires_validators(tmp_path):
+    response_cache = ResponseCache(str(tmp_path))
+
+    assert response_cache.store('https://tenki.jp/', b'body') is None
+    assert response_cache.load('https://tenki.jp/') is None
+
+    response_cache.store('https://tenki.jp/', b'body', etag='"a"')
+    entry = response_cache.load('https://tenki.jp/')
+
+    assert entry['body'] == b'body'
+    assert entry['etag'] == '"a"'
+    assert entry['last_modified'] is None
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    response_cache = ResponseCache(str(tmp_path), max_bytes=16 * 1024)
+
+    for index in range(8):
+        response_cache.store(
+            'https://tenki.jp/{}/'.format(index),
+            b'x' * 4096,
+            etag=str(index)
+        )
+
+    assert response_cache.load('https://tenki.jp/0/') is None
+    assert response_cache.load('https://tenki.jp/7/') is not None
+    assert sum(
+        entry.stat().st_size for entry in os.scandir(str(tmp_path))
+    ) <= 16 * 1024
+
+
+def test_response_cache_shared_between_processes(tmp_path):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            _store_and_load,
+            [str(tmp_path)] * 16,
+            range(16)
+        ))
+
+    assert all(results)
+    assert not [
+        entry for entry in os.scandir(str(tmp_path))
+        if entry.name.endswith('.tmp')
+    ]
+
+
+def test_transport_revalidates_cached_response(requests_mock, tmp_path):
+    url = 'https://tenki.jp/'
+    requests_mock.get(url, [
+        {'content': b'body', 'headers': {'ETag': '"a"'}},
+        {'status_code': 304},
+    ])
+    transport = Transport(response_cache=ResponseCache(str(tmp_path)))
+    response = transport.get(url)
+
+    assert response.content == b'body'
+    assert not response.from_cache
+
+    response = transport.get(url)
+
+    assert requests_mock.last_request.headers['If-None-Match'] == '"a"'
+    assert response.status_code == 200
+    assert response.content == b'body'
+    assert response.from_cache
+
+
+def test_weather_scraper_reuses_parsed_output(
+        mocker,
+        requests_mock,
+        tmp_path,
+        forecast_summary_html,
+        location_ids
+):
+    requests_mock.get(_forecast_url(BASE_URL, location_ids), [
+        {
+            'content': forecast_summary_html,
+            'headers': {'Last-Modified': 'Thu, 20 Aug 2020 06:00:00 GMT'},
+        },
+        {'status_code': 304},
+    ])
+    spy_parse_content = mocker.spy(parsing, 'parse_content')
+    weather_scraper = WeatherScraper(
+        transport=Transport(response_cache=ResponseCache(str(tmp_path)))
+    )
+    output = weather_scraper.extract_forecast_summary(location_ids)
+
+    assert output['city'] == '千代田区'
+    assert weather_scraper.extract_forecast_summary(location_ids) == output
+    assert spy_parse_content.call_count == 1
+    assert (
+        requests_mock.last_request.headers['If-Modified-Since']
+        == 'Thu, 20 Aug 2020 06:00:00 GMT'
+    )
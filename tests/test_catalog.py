@@ -0,0 +1,205 @@
+import re
+
+import pytest
+
+import conftest
+from tenki_no_ko import CrawlError
+from tenki_no_ko import LocationCatalog
+from tenki_no_ko import LocationScraper
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko import parsing
+
+INDEX_HTML = '''
+<table class="common-list-entries">
+  <tr><th><a href="/forecast/3/">関東・甲信地方</a></th></tr>
+</table>
+'''
+PREFECTURE_HTML = '''
+<table class="common-list-entries">
+  <tr><td><ul>
+    <li><a class="pref-link" href="/forecast/3/16/">東京都</a></li>
+  </ul></td></tr>
+</table>
+'''
+
+
+@pytest.fixture
+def catalog_server(fixture_server):
+    fixture_server.pages['/'] = INDEX_HTML.encode('utf-8')
+    fixture_server.pages['/forecast/3/'] = PREFECTURE_HTML.encode('utf-8')
+    return fixture_server
+
+
+def test_build_catalog(catalog_server, location_ids):
+    catalog = LocationCatalog()
+    count = catalog.build(LocationScraper(base_url=catalog_server.base_url))
+
+    assert count == len(catalog) > 0
+    assert catalog.location_ids('13101') == location_ids
+    assert catalog.get(13101) == {
+        'city_id': '13101',
+        'city_name': '千代田区',
+        'region_id': '3',
+        'region_name': '関東・甲信地方',
+        'prefecture_id': '16',
+        'prefecture_name': '東京都',
+        'subprefecture_id': '4410',
+        'subprefecture_name': '東京23区',
+    }
+    assert '99999' not in catalog
+    assert [
+        city['city_id'] for city in catalog.find(city_name='千代田区')
+    ] == ['13101']
+    assert all(
+        city['subprefecture_name'] == '東京23区'
+        for city in catalog.find(
+            prefecture_id='16',
+            subprefecture_name='東京23区'
+        )
+    )
+
+
+def test_build_catalog_with_failed_page(catalog_server):
+    del catalog_server.pages['/forecast/3/16/']
+    catalog = LocationCatalog()
+
+    with pytest.raises(CrawlError) as excinfo:
+        catalog.build(LocationScraper(base_url=catalog_server.base_url))
+
+    assert excinfo.value.failed == [
+        '{}/forecast/3/16/'.format(catalog_server.base_url)
+    ]
+    assert len(catalog) == 0
+
+
+def test_catalog_is_persistent(catalog_server, tmp_path, location_ids):
+    path = str(tmp_path / 'catalog.sqlite3')
+
+    with LocationCatalog(path) as catalog:
+        catalog.build(LocationScraper(base_url=catalog_server.base_url))
+
+    with LocationCatalog(path) as catalog:
+        assert catalog.location_ids('13101') == location_ids
+
+
+def test_weather_scraper_with_city_id(catalog_server):
+    catalog = LocationCatalog()
+    catalog.build(LocationScraper(base_url=catalog_server.base_url))
+    weather_scraper = WeatherScraper(
+        base_url=catalog_server.base_url,
+        catalog=catalog
+    )
+
+    assert weather_scraper.extract_forecast_summary('13101')['city'] == (
+        '千代田区'
+    )
+    assert weather_scraper.extract_forecast_summary('99999')['city'] == ''
+
+    output = weather_scraper.extract_3_hourly_forecasts_batch(['13101'])
+
+    assert output['13101']['forecast']['today'][0]['weather']
+
+
+def test_listing_forecasts_with_catalog(catalog_server, location_ids):
+    catalog = LocationCatalog()
+    catalog.build(LocationScraper(base_url=catalog_server.base_url))
+    catalog_server.pages['/'] = conftest.test_file('index.html').encode(
+        'utf-8'
+    )
+
+    # Links on the top page stop at the prefecture
+    output = WeatherScraper(
+        base_url=catalog_server.base_url
+    ).extract_listing_forecasts()
+    assert output['forecasts']['13101']['location_ids'] is None
+
+    output = WeatherScraper(
+        base_url=catalog_server.base_url,
+        catalog=catalog
+    ).extract_listing_forecasts()
+    assert output['forecasts']['13101']['location_ids'] == location_ids
+    # Sapporo is not in the catalog, which only holds Tokyo
+    assert output['forecasts']['1100']['location_ids'] is None
+
+
+def test_refresh_catalog(catalog_server):
+    catalog_server.etags = True
+    location_scraper = LocationScraper(base_url=catalog_server.base_url)
+    catalog = LocationCatalog()
+    catalog.build(location_scraper)
+    count = len(catalog)
+    diff = catalog.refresh(location_scraper)
+
+    assert diff == {'added': [], 'removed': [], 'renamed': [], 'parsed': []}
+    assert len(catalog) == count
+
+    # Chiyoda is renamed and Chuo merged away
+    path = '/forecast/3/16/'
+    content = catalog_server.pages[path].decode('utf-8')
+    content = content.replace(
+        '<a href="/forecast/3/16/4410/13101/">\n    千代田区',
+        '<a href="/forecast/3/16/4410/13101/">\n    千代田市'
+    )
+    content = re.sub(
+        r'<li>\s*<a href="/forecast/3/16/4410/13102/">.*?</li>',
+        '',
+        content,
+        flags=re.DOTALL
+    )
+    catalog_server.pages[path] = content.encode('utf-8')
+    diff = catalog.refresh(location_scraper)
+
+    assert diff['added'] == []
+    assert [city['city_id'] for city in diff['removed']] == ['13102']
+    assert [
+        (old['city_name'], new['city_name'])
+        for old, new in diff['renamed']
+    ] == [('千代田区', '千代田市')]
+    assert diff['parsed'] == [catalog_server.base_url + path]
+    assert catalog.get('13101')['city_name'] == '千代田市'
+    assert len(catalog) == count - 1
+
+
+def test_refresh_catalog_ignores_forecast_changes(mocker, catalog_server):
+    location_scraper = LocationScraper(base_url=catalog_server.base_url)
+    catalog = LocationCatalog()
+    catalog.build(location_scraper)
+
+    # A new publish: other temperatures, publish time and warnings
+    path = '/forecast/3/16/'
+    content = catalog_server.pages[path].decode('utf-8')
+    content = re.sub(
+        r'(<span class="max-temp">\s*)\d+',
+        r'\g<1>12',
+        content
+    )
+    content = content.replace('19日22:00発表', '20日05:00発表')
+    catalog_server.pages[path] = content.encode('utf-8')
+    catalog_server.pages['/forecast/3/'] = PREFECTURE_HTML.replace(
+        '東京都</a>',
+        '東京都</a><a class="warn-icon" href="/bousai/warn/3/16/"></a>'
+    ).encode('utf-8')
+    spy_parse_content = mocker.spy(parsing, 'parse_content')
+    diff = catalog.refresh(location_scraper)
+
+    assert diff == {'added': [], 'removed': [], 'renamed': [], 'parsed': []}
+    assert spy_parse_content.call_count == 0
+
+    # A change to the hierarchy itself is still parsed
+    content = content.replace('小笠原村', '小笠原町')
+    catalog_server.pages[path] = content.encode('utf-8')
+    diff = catalog.refresh(location_scraper)
+
+    assert diff['parsed'] == [catalog_server.base_url + path]
+    assert catalog.get('13421')['city_name'] == '小笠原町'
+
+
+def test_refresh_catalog_without_validators(mocker, catalog_server):
+    location_scraper = LocationScraper(base_url=catalog_server.base_url)
+    catalog = LocationCatalog()
+    catalog.build(location_scraper)
+    spy_parse_content = mocker.spy(parsing, 'parse_content')
+    diff = catalog.refresh(location_scraper)
+
+    assert diff['parsed'] == []
+    assert spy_parse_content.call_count == 0
@@ -0,0 +1,247 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+import requests
+
+from tenki_no_ko import AsyncSingleFlight
+from tenki_no_ko import SingleFlight
+from tenki_no_ko import WeatherScraper
+
+
+def test_single_flight_shares_concurrent_calls():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def _call():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {'value': 1}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        leader = executor.submit(single_flight.do, 'key', _call)
+        started.wait()
+        followers = [
+            executor.submit(single_flight.do, 'key', _call)
+            for _ in range(7)
+        ]
+
+        while single_flight.coalesced < 7:
+            time.sleep(0.001)
+
+        assert single_flight.stats() == {
+            'calls': 1,
+            'coalesced': 7,
+            'in_flight': 1,
+        }
+        release.set()
+        results = [leader.result()] + [
+            follower.result() for follower in followers
+        ]
+
+    assert len(calls) == 1
+    assert all(result == {'value': 1} for result in results)
+    # Each caller gets its own copy
+    assert len({id(result) for result in results}) == 8
+    assert single_flight.stats()['in_flight'] == 0
+
+
+def test_single_flight_leader_mutations_stay_private():
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    def _call():
+        release.wait()
+        return {'city': '千代田区'}
+
+    def _leader():
+        result = single_flight.do('key', _call)
+        result['3_hourly_forecasts'] = {}
+        return result
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(_leader)
+
+        while single_flight.stats()['in_flight'] == 0:
+            time.sleep(0.001)
+
+        follower = executor.submit(single_flight.do, 'key', _call)
+
+        while single_flight.coalesced == 0:
+            time.sleep(0.001)
+
+        release.set()
+
+        assert leader.result() == {'city': '千代田区', '3_hourly_forecasts': {}}
+        assert follower.result() == {'city': '千代田区'}
+
+
+def test_single_flight_runs_sequential_calls_again():
+    single_flight = SingleFlight()
+
+    assert single_flight.do('key', lambda: 1) == 1
+    assert single_flight.do('key', lambda: 2) == 2
+    assert single_flight.stats() == {
+        'calls': 2,
+        'coalesced': 0,
+        'in_flight': 0,
+    }
+
+
+def test_single_flight_shares_exceptions():
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    def _call():
+        release.wait()
+        raise ValueError('failed')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, 'key', _call)
+
+        while single_flight.stats()['in_flight'] == 0:
+            time.sleep(0.001)
+
+        follower = executor.submit(single_flight.do, 'key', _call)
+
+        while single_flight.coalesced == 0:
+            time.sleep(0.001)
+
+        release.set()
+
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+
+
+def test_async_single_flight():
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def _call(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return [value]
+
+    async def _main():
+        return await asyncio.gather(*[
+            single_flight.do('key', _call, 1) for _ in range(10)
+        ])
+
+    results = asyncio.run(_main())
+
+    assert calls == [1]
+    assert results == [[1]] * 10
+    assert single_flight.stats() == {
+        'calls': 1,
+        'coalesced': 9,
+        'in_flight': 0,
+    }
+
+
+def test_async_single_flight_leader_mutations_stay_private():
+    single_flight = AsyncSingleFlight()
+
+    async def _call():
+        await asyncio.sleep(0.05)
+        return {'city': '千代田区'}
+
+    async def _leader():
+        result = await single_flight.do('key', _call)
+        result['3_hourly_forecasts'] = {}
+        return result
+
+    async def _follower():
+        await asyncio.sleep(0)
+        result = await single_flight.do('key', _call)
+        # Let the leader mutate its result first
+        await asyncio.sleep(0)
+        return result
+
+    async def _main():
+        return await asyncio.gather(_leader(), _follower())
+
+    leader, follower = asyncio.run(_main())
+
+    assert leader == {'city': '千代田区', '3_hourly_forecasts': {}}
+    assert follower == {'city': '千代田区'}
+    assert single_flight.stats()['coalesced'] == 1
+
+
+def test_async_single_flight_survives_cancelled_callers():
+    single_flight = AsyncSingleFlight()
+
+    async def _call():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def _main():
+        first = asyncio.ensure_future(single_flight.do('key', _call))
+        second = asyncio.ensure_future(single_flight.do('key', _call))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(_main()) == 'done'
+
+
+def test_weather_scraper_coalesces_identical_lookups(
+        fixture_server,
+        location_ids
+):
+    fixture_server.latency = 0.2
+    single_flight = SingleFlight()
+    weather_scraper = WeatherScraper(
+        base_url=fixture_server.base_url,
+        single_flight=single_flight
+    )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+        outputs = list(executor.map(
+            weather_scraper.extract_forecast_summary,
+            [location_ids] * 20
+        ))
+
+    assert all(output['city'] == '千代田区' for output in outputs)
+    assert fixture_server.requests == ['/forecast/3/16/4410/13101/']
+    assert single_flight.stats() == {
+        'calls': 1,
+        'coalesced': 19,
+        'in_flight': 0,
+    }
+
+
+def test_weather_scraper_shares_fetch_failures(mocker, location_ids):
+    single_flight = SingleFlight()
+    weather_scraper = WeatherScraper(
+        base_url='http://tenki.invalid',
+        single_flight=single_flight
+    )
+
+    def _get(url, **kwargs):
+        time.sleep(0.2)
+        raise requests.exceptions.ConnectionError
+
+    mocker.patch.object(weather_scraper.transport, 'get', side_effect=_get)
+    records = list(weather_scraper.iter_forecast_summaries(
+        [location_ids] * 8,
+        max_workers=8
+    ))
+
+    assert single_flight.stats()['coalesced'] > 0
+    assert all(record['forecast'] is None for record in records)
+    assert all(
+        isinstance(record['error'], requests.exceptions.ConnectionError)
+        for record in records
+    )
+
+    # The single extractors still fall back to empty results
+    assert weather_scraper.extract_forecast_summary(
+        location_ids
+    )['city'] == ''
@@ -0,0 +1,202 @@
+import ast
+import array
+import csv
+import datetime
+import io
+import json
+import math
+import zipfile
+
+import pytest
+
+from tenki_no_ko import ThreeHourlyColumns
+from tenki_no_ko import parsing
+from tenki_no_ko.scraper import _next_24_hours
+
+
+@pytest.fixture
+def three_hourly_forecasts(three_hourly_forecast_html):
+    return parsing.parse_content(
+        three_hourly_forecast_html,
+        parsing.parse_3_hourly_forecasts,
+        extra_rows=['humidity']
+    )
+
+
+@pytest.fixture
+def columns(three_hourly_forecasts):
+    return ThreeHourlyColumns.from_forecasts(
+        [
+            ('13101', three_hourly_forecasts),
+            ('13102', None),
+            ('13103', three_hourly_forecasts),
+        ],
+        rows=('temp', 'humidity')
+    )
+
+
+def _read_npy(data):
+    # Minimal .npy reader, enough for the arrays written by write_npz
+    header_length = int.from_bytes(data[8:10], 'little')
+    header = ast.literal_eval(data[10:10 + header_length].decode('latin1'))
+    body = data[10 + header_length:]
+
+    if 'U' in header['descr']:
+        width = int(header['descr'].split('U')[1])
+        text = body.decode('utf-32-le')
+        return [
+            text[index:index + width].rstrip('\0')
+            for index in range(0, len(text), width)
+        ], header['shape']
+
+    typecode = {'|u1': 'B', '<u2': 'H', '<f8': 'd'}[header['descr']]
+    return array.array(typecode, body), header['shape']
+
+
+def test_columns(columns, three_hourly_forecasts):
+    assert len(columns) == 3
+    assert columns.slots == 16
+    assert list(columns.hours[:2]) == [3, 6]
+    assert columns.hours[-1] == 48
+    assert list(columns.values('temp', 0)) == [
+        float(forecast['temp'])
+        for forecast in (
+            three_hourly_forecasts['today']
+            + three_hourly_forecasts['tomorrow']
+        )
+    ]
+    assert columns.telops(0)[0] == '晴れ'
+    assert columns.weathers[0] == ''
+    assert columns.telops(1) == [''] * 16
+    assert all(math.isnan(value) for value in columns.values('temp', 1))
+
+
+def test_columns_with_unknown_rows():
+    with pytest.raises(ValueError):
+        ThreeHourlyColumns(rows=('temp', 'hour'))
+
+
+def test_columns_with_many_weathers(mocker):
+    columns = ThreeHourlyColumns()
+
+    for index in range(300):
+        columns.append(str(index), {
+            'today': [{'hour': '03', 'weather': 'telop {}'.format(index)}],
+        })
+
+    assert columns.telops(299)[0] == 'telop 299'
+    assert columns.window(0, 1).telops(299) == ['telop 299']
+
+    mocker.patch('tenki_no_ko.columnar.MAX_WEATHERS', len(columns.weathers))
+
+    with pytest.raises(ValueError):
+        columns.append('300', {
+            'today': [{'hour': '03', 'weather': 'telop 300'}],
+        })
+
+
+def test_window(columns):
+    window = columns.window(5, 4)
+
+    assert list(window.hours) == [18, 21, 24, 27]
+    assert window.city_ids == columns.city_ids
+
+    for index in range(len(columns)):
+        assert window.telops(index) == columns.telops(index)[5:9]
+        # Bytes, as NaN never equals itself
+        assert window.values('humidity', index).tobytes() == (
+            columns.values('humidity', index)[5:9].tobytes()
+        )
+
+    assert columns.window(14, 8).slots == 2
+
+
+@pytest.mark.parametrize('hour', [0, 5, 13, 23])
+def test_next_24_hours(
+        mocker,
+        columns,
+        three_hourly_forecasts,
+        hour
+):
+    now = datetime.datetime(2020, 8, 20, hour)
+    mock_datetime = mocker.patch('tenki_no_ko.scraper.datetime')
+    mock_datetime.datetime.now.return_value = now
+    expected = _next_24_hours(three_hourly_forecasts)
+    window = columns.next_24_hours(now)
+
+    assert window.slots == 8
+    assert len(window) == 3
+    assert list(window.values('temp', 2)) == [
+        float(forecast['temp']) for forecast in expected
+    ]
+    assert window.telops(0) == [forecast['weather'] for forecast in expected]
+
+
+def test_write_ndjson(columns):
+    f = io.StringIO()
+    columns.write_ndjson(f)
+    records = [json.loads(line) for line in f.getvalue().splitlines()]
+
+    assert [record['city_id'] for record in records] == [
+        '13101',
+        '13102',
+        '13103',
+    ]
+    assert records[0]['temp'] == list(columns.values('temp', 0))
+    assert records[1]['temp'] == [None] * 16
+
+
+def test_write_csv(columns):
+    f = io.StringIO()
+    columns.write_csv(f)
+    rows = list(csv.reader(io.StringIO(f.getvalue())))
+
+    assert rows[0] == ['city_id', 'hour', 'weather', 'temp', 'humidity']
+    assert len(rows) == 1 + 3 * 16
+    assert rows[1][:3] == ['13101', '3', '晴れ']
+    assert rows[17][2:] == ['', '', '']
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_write_npz(columns, compress):
+    f = io.BytesIO()
+    columns.write_npz(f, compress=compress)
+
+    with zipfile.ZipFile(f) as archive:
+        arrays = {
+            name[:-len('.npy')]: _read_npy(archive.read(name))
+            for name in archive.namelist()
+        }
+
+    assert arrays['city_ids'] == (['13101', '13102', '13103'], (3,))
+    assert arrays['hours'] == (columns.hours, (16,))
+    assert arrays['weathers'] == (columns.weathers, (len(columns.weathers),))
+    assert arrays['weather'] == (columns.weather, (3, 16))
+    assert arrays['temp'][1] == (3, 16)
+    assert arrays['temp'][0][:16] == columns.values('temp', 0)
+
+
+def test_to_numpy(columns):
+    numpy = pytest.importorskip('numpy')
+    arrays = columns.to_numpy()
+
+    assert arrays['temp'].shape == (3, 16)
+    assert numpy.isnan(arrays['temp'][1]).all()
+
+    f = io.BytesIO()
+    columns.write_npz(f)
+    f.seek(0)
+
+    with numpy.load(f) as archive:
+        assert list(archive['city_ids']) == columns.city_ids
+        assert (archive['weather'] == arrays['weather']).all()
+
+
+def test_append_after_to_numpy(columns, three_hourly_forecasts):
+    pytest.importorskip('numpy')
+    arrays = columns.to_numpy()
+    columns.append('13104', three_hourly_forecasts)
+
+    assert len(columns) == 4
+    assert arrays['temp'].shape == (3, 16)
+    assert columns.to_numpy()['temp'].shape == (4, 16)
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from tenki_no_ko.concurrency import bounded_map
+
+
+def test_bounded_map():
+    output = sorted(
+        (item, result, exception)
+        for item, result, exception in bounded_map(
+            lambda item: item * 2,
+            range(5),
+            max_workers=2
+        )
+    )
+
+    assert output == [(index, index * 2, None) for index in range(5)]
+
+
+def test_bounded_map_with_exception():
+    def _function(item):
+        if item == 1:
+            raise ValueError(item)
+        return item
+
+    output = {
+        item: (result, exception)
+        for item, result, exception in bounded_map(_function, range(3))
+    }
+
+    assert output[0] == (0, None)
+    assert output[1][0] is None
+    assert isinstance(output[1][1], ValueError)
+    assert output[2] == (2, None)
+
+
+@pytest.mark.parametrize('max_in_flight', [0, -1])
+def test_bounded_map_rejects_invalid_max_in_flight(max_in_flight):
+    with pytest.raises(ValueError):
+        list(bounded_map(
+            lambda item: item,
+            range(3),
+            max_in_flight=max_in_flight
+        ))
+
+
+def test_bounded_map_limits_in_flight_calls():
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def _function(item):
+        with lock:
+            in_flight.append(item)
+            peak.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(item)
+
+    list(bounded_map(_function, range(20), max_workers=8, max_in_flight=3))
+
+    assert max(peak) <= 3
+
+
+def test_bounded_map_ordered():
+    def _function(item):
+        # Later items finish first
+        time.sleep(0.01 * (5 - item))
+        return item
+
+    output = [
+        item for item, _, _ in bounded_map(
+            _function,
+            range(5),
+            max_workers=5,
+            ordered=True
+        )
+    ]
+
+    assert output == list(range(5))
+
+
+def test_bounded_map_applies_backpressure():
+    started = []
+
+    def _items():
+        for item in range(100):
+            started.append(item)
+            yield item
+
+    results = bounded_map(lambda item: item, _items(), max_in_flight=4)
+
+    for index, _ in enumerate(results):
+        time.sleep(0.001)
+        # Never more than max_in_flight items ahead of the consumer
+        assert len(started) <= index + 1 + 4
+
+        if index == 9:
+            break
+
+    results.close()
+
+    assert len(started) < 20
@@ -0,0 +1,195 @@
+import time
+
+import requests
+
+from tenki_no_ko import ChangeTracker
+from tenki_no_ko import ForecastCache
+from tenki_no_ko import Transport
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko import parsing
+
+SUMMARY_PATH = '/forecast/3/16/4410/13101/'
+THREE_HOURLY_PATH = '/forecast/3/16/4410/13101/3hours.html'
+
+
+def _republish(fixture_server, path, old, new):
+    fixture_server.pages[path] = fixture_server.pages[path].replace(
+        '{}発表'.format(old).encode('utf-8'),
+        '{}発表'.format(new).encode('utf-8')
+    )
+
+
+def test_parse_forecast_header(forecast_summary_html):
+    assert parsing.parse_content(
+        forecast_summary_html,
+        parsing.parse_forecast_header
+    ) == {'update_datetime': '20日06:00'}
+    assert parsing.parse_forecast_header(None) == {'update_datetime': ''}
+
+
+def test_extract_update_datetime(fixture_server, location_ids):
+    weather_scraper = WeatherScraper(base_url=fixture_server.base_url)
+
+    assert weather_scraper.extract_update_datetime(
+        location_ids
+    ) == '20日06:00'
+    assert weather_scraper.extract_update_datetime(None) == ''
+    assert weather_scraper.extract_update_datetime(
+        dict(location_ids, city_id='99999')
+    ) == ''
+
+
+def test_extract_update_datetime_stops_download_early(
+        fixture_server,
+        location_ids
+):
+    fixture_server.chunk_size = 4096
+    fixture_server.delay = 0.005
+    weather_scraper = WeatherScraper(base_url=fixture_server.base_url)
+
+    weather_scraper.extract_update_datetime(location_ids)
+    content = fixture_server.pages[SUMMARY_PATH]
+
+    # Give the server a moment to notice the closed connection
+    for _ in range(100):
+        sent = fixture_server.sent[SUMMARY_PATH]
+        time.sleep(0.01)
+        if sent == fixture_server.sent[SUMMARY_PATH]:
+            break
+
+    assert fixture_server.sent[SUMMARY_PATH] < len(content) // 2
+
+
+def test_change_tracker_skips_unchanged_pages(fixture_server, location_ids):
+    change_tracker = ChangeTracker(
+        WeatherScraper(base_url=fixture_server.base_url)
+    )
+
+    output = change_tracker.extract_forecast_summary(location_ids)
+    assert output['update_datetime'] == '20日06:00'
+    assert fixture_server.requests == [SUMMARY_PATH, SUMMARY_PATH]
+
+    fixture_server.requests.clear()
+    assert change_tracker.extract_forecast_summary(location_ids) is None
+    assert fixture_server.requests == [SUMMARY_PATH]
+
+    _republish(fixture_server, SUMMARY_PATH, '20日06:00', '20日11:00')
+    output = change_tracker.extract_forecast_summary(location_ids)
+    assert output['update_datetime'] == '20日11:00'
+
+    assert change_tracker.stats() == {
+        'checked': 3,
+        'changed': 2,
+        'unchanged': 1,
+    }
+    assert change_tracker.update_datetimes == {
+        fixture_server.base_url + SUMMARY_PATH: '20日11:00',
+    }
+
+
+def test_change_tracker_bypasses_outdated_cache(
+        fixture_server,
+        location_ids
+):
+    weather_scraper = WeatherScraper(
+        base_url=fixture_server.base_url,
+        cache=ForecastCache()
+    )
+    change_tracker = ChangeTracker(weather_scraper)
+    change_tracker.extract_forecast_summary(location_ids)
+
+    _republish(fixture_server, SUMMARY_PATH, '20日06:00', '20日09:00')
+    output = change_tracker.extract_forecast_summary(location_ids)
+
+    assert output['update_datetime'] == '20日09:00'
+    assert weather_scraper.extract_forecast_summary(
+        location_ids
+    )['update_datetime'] == '20日09:00'
+    assert change_tracker.extract_forecast_summary(location_ids) is None
+
+
+def test_change_tracker_with_3_hourly_forecasts(
+        fixture_server,
+        location_ids
+):
+    change_tracker = ChangeTracker(
+        WeatherScraper(base_url=fixture_server.base_url),
+        update_datetimes={
+            fixture_server.base_url + THREE_HOURLY_PATH: '20日08:00',
+        }
+    )
+
+    # Remembered from an earlier run
+    assert change_tracker.extract_3_hourly_forecasts(
+        location_ids,
+        ['humidity']
+    ) is None
+
+    _republish(fixture_server, THREE_HOURLY_PATH, '20日08:00', '20日11:00')
+    output = change_tracker.extract_3_hourly_forecasts(
+        location_ids,
+        ['humidity']
+    )
+
+    assert output['today'][0]['humidity']
+    assert fixture_server.requests == [
+        THREE_HOURLY_PATH,
+        THREE_HOURLY_PATH,
+        THREE_HOURLY_PATH,
+    ]
+
+
+def test_change_tracker_retries_failed_pages(fixture_server, location_ids):
+    change_tracker = ChangeTracker(
+        WeatherScraper(base_url=fixture_server.base_url)
+    )
+    unknown_location_ids = dict(location_ids, city_id='99999')
+
+    for _ in range(2):
+        assert change_tracker.extract_forecast_summary(
+            unknown_location_ids
+        ) == parsing.parse_forecast_summary(None)
+
+    assert change_tracker.update_datetimes == {}
+
+
+def test_change_tracker_emits_changed_records_only(
+        fixture_server,
+        location_ids
+):
+    change_tracker = ChangeTracker(
+        WeatherScraper(base_url=fixture_server.base_url)
+    )
+    change_tracker.extract_forecast_summary(location_ids)
+
+    records = list(change_tracker.iter_forecast_summaries(
+        [location_ids, dict(location_ids, city_id='99999')],
+        ordered=True
+    ))
+
+    assert len(records) == 1
+    assert records[0]['location_ids']['city_id'] == '99999'
+    assert records[0]['error'] is None
+
+    _republish(fixture_server, SUMMARY_PATH, '20日06:00', '20日11:00')
+    records = list(change_tracker.iter_forecast_summaries([location_ids]))
+
+    assert len(records) == 1
+    assert records[0]['forecast']['update_datetime'] == '20日11:00'
+
+
+def test_change_tracker_reports_fetch_failures(location_ids):
+    # Refused connections
+    change_tracker = ChangeTracker(
+        WeatherScraper(
+            transport=Transport(retries=0),
+            base_url='http://127.0.0.1:9'
+        )
+    )
+    records = list(change_tracker.iter_3_hourly_forecasts([location_ids]))
+
+    assert records[0]['forecast'] is None
+    assert isinstance(
+        records[0]['error'],
+        requests.exceptions.ConnectionError
+    )
@@ -0,0 +1,191 @@
+import time
+
+import pytest
+import requests
+
+from tenki_no_ko import AdaptiveLimiter
+from tenki_no_ko import Metrics
+from tenki_no_ko import Transport
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko.limiter import parse_retry_after
+
+URL = 'http://tenki.invalid/'
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('-1') == 0
+    assert parse_retry_after(
+        'Wed, 21 Oct 2015 07:28:10 GMT',
+        now=1445412480
+    ) == 10
+    assert parse_retry_after('soon') is None
+
+
+def test_limiter_rejects_invalid_decrease_factor():
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(decrease_factor=1)
+
+
+def test_limiter_increases_additively_and_decreases_multiplicatively():
+    limiter = AdaptiveLimiter(rate=None, initial_concurrency=4)
+
+    for _ in range(8):
+        ticket = limiter.acquire(URL)
+        limiter.release(URL, ticket, 200, 0.0)
+
+    assert limiter.stats()['tenki.invalid']['limit'] == 5
+
+    ticket = limiter.acquire(URL)
+    limiter.release(URL, ticket, 503, 0.0)
+
+    assert limiter.stats()['tenki.invalid'] == {
+        'limit': 2,
+        'in_flight': 0,
+        'latency': 0.0,
+        'requests': 9,
+        'throttled': 1,
+    }
+
+
+def test_limiter_backs_off_on_latency_spikes():
+    limiter = AdaptiveLimiter(rate=None, initial_concurrency=8)
+
+    for latency in (0.1, 0.1, 1.0):
+        ticket = limiter.acquire(URL)
+        limiter.release(URL, ticket, 200, latency)
+
+    stats = limiter.stats()['tenki.invalid']
+    assert stats['limit'] == 4
+    assert stats['throttled'] == 1
+
+
+def test_limiter_keeps_min_concurrency():
+    limiter = AdaptiveLimiter(
+        rate=None,
+        initial_concurrency=2,
+        min_concurrency=2
+    )
+
+    ticket = limiter.acquire(URL)
+    limiter.release(URL, ticket, None, 0.0)
+
+    assert limiter.stats()['tenki.invalid']['limit'] == 2
+
+
+def test_limiter_paces_requests_per_host():
+    limiter = AdaptiveLimiter(rate=20, burst=1)
+
+    started = time.monotonic()
+
+    for _ in range(5):
+        ticket = limiter.acquire(URL)
+        limiter.release(URL, ticket, 200, 0.0)
+
+    # The first request uses the burst, the other four wait 50 ms each
+    assert time.monotonic() - started >= 0.19
+
+    # Other hosts have buckets of their own
+    started = time.monotonic()
+    limiter.acquire('http://other.invalid/')
+    assert time.monotonic() - started < 0.05
+
+
+def test_transport_caps_concurrency(fixture_server, location_ids):
+    fixture_server.latency = 0.1
+    weather_scraper = WeatherScraper(
+        transport=Transport(
+            limiter=AdaptiveLimiter(
+                rate=None,
+                initial_concurrency=2,
+                min_concurrency=2,
+                max_concurrency=2
+            )
+        ),
+        base_url=fixture_server.base_url
+    )
+
+    records = list(weather_scraper.iter_forecast_summaries(
+        [location_ids] * 8,
+        max_workers=8
+    ))
+
+    assert all(record['forecast']['city'] for record in records)
+    assert fixture_server.max_active == 2
+
+
+def test_transport_retries_throttled_requests(fixture_server, location_ids):
+    fixture_server.throttle = 1
+    fixture_server.retry_after = 1
+    limiter = AdaptiveLimiter(rate=None, initial_concurrency=4)
+    weather_scraper = WeatherScraper(
+        transport=Transport(limiter=limiter),
+        base_url=fixture_server.base_url
+    )
+
+    started = time.monotonic()
+    output = weather_scraper.extract_forecast_summary(location_ids)
+
+    assert output['city'] == '千代田区'
+    assert time.monotonic() - started >= 1
+    assert len(fixture_server.requests) == 2
+    assert limiter.stats()[fixture_server.base_url[7:]]['throttled'] == 1
+    assert limiter.stats()[fixture_server.base_url[7:]]['limit'] == 2
+
+
+def test_transport_backs_off_without_retry_after(fixture_server):
+    fixture_server.throttle = 2
+    transport = Transport(
+        retries=2,
+        backoff_factor=0.01,
+        limiter=AdaptiveLimiter(rate=None)
+    )
+
+    response = transport.get(fixture_server.base_url + '/')
+
+    assert response.status_code == 200
+    assert len(fixture_server.requests) == 3
+
+
+def test_transport_gives_up_after_retries(fixture_server):
+    fixture_server.throttle = 5
+    transport = Transport(
+        retries=1,
+        backoff_factor=0.01,
+        limiter=AdaptiveLimiter(rate=None)
+    )
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        transport.get(fixture_server.base_url + '/')
+
+    assert len(fixture_server.requests) == 2
+
+
+def test_transport_fails_on_lasting_server_errors(
+        fixture_server,
+        location_ids
+):
+    fixture_server.throttle = 100
+    fixture_server.throttle_status = 503
+    metrics = Metrics()
+    weather_scraper = WeatherScraper(
+        transport=Transport(
+            retries=2,
+            backoff_factor=0.01,
+            limiter=AdaptiveLimiter(rate=None)
+        ),
+        base_url=fixture_server.base_url,
+        metrics=metrics
+    )
+
+    output = weather_scraper.extract_forecast_summary(location_ids)
+
+    assert output['city'] == ''
+    assert len(fixture_server.requests) == 3
+    assert metrics.snapshot()['extractors']['parse_forecast_summary'] == {
+        'success': 0,
+        'parse_miss': 0,
+        'network_error': 1,
+        'cache_hit': 0,
+    }
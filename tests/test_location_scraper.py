@@ -1,5 +1,7 @@
 from bs4 import BeautifulSoup
 
+from tenki_no_ko import parsing
+
 
 def test_extract_regions(mocker, index_html, location_scraper):
     mock_get_soup = mocker.patch.object(
@@ -9,7 +11,10 @@ def test_extract_regions(mocker, index_html, location_scraper):
     )
     output = location_scraper.extract_regions()
 
-    mock_get_soup.assert_called_once_with('https://tenki.jp')
+    mock_get_soup.assert_called_once_with(
+        'https://tenki.jp',
+        parse_only=parsing.parse_regions.parse_only
+    )
     assert output['1'] == '北海道地方'
     assert output['10'] == '沖縄地方'
 
@@ -22,7 +27,10 @@ def test_failed_to_extract_regions(mocker, location_scraper):
     )
     output = location_scraper.extract_regions()
 
-    mock_get_soup.assert_called_once_with('https://tenki.jp')
+    mock_get_soup.assert_called_once_with(
+        'https://tenki.jp',
+        parse_only=parsing.parse_regions.parse_only
+    )
     assert output is None
 
 
@@ -34,7 +42,10 @@ def test_extract_prefectures(mocker, prefecture_html, location_scraper):
     )
     output = location_scraper.extract_prefectures(region_id=3)
 
-    mock_get_soup.assert_called_once_with('https://tenki.jp/forecast/3/')
+    mock_get_soup.assert_called_once_with(
+        'https://tenki.jp/forecast/3/',
+        parse_only=parsing.parse_prefectures.parse_only
+    )
     assert output['16'] == '東京都'
     assert output['23'] == '長野県'
 
@@ -47,7 +58,10 @@ def test_failed_to_extract_prefectures(mocker, location_scraper):
     )
     output = location_scraper.extract_prefectures(region_id=3)
 
-    mock_get_soup.assert_called_once_with('https://tenki.jp/forecast/3/')
+    mock_get_soup.assert_called_once_with(
+        'https://tenki.jp/forecast/3/',
+        parse_only=parsing.parse_prefectures.parse_only
+    )
     assert output is None
 
 
@@ -75,7 +89,10 @@ def test_extract_subprefectures_and_cities(
         prefecture_id=16
     )
 
-    mock_get_soup.assert_called_once_with('https://tenki.jp/forecast/3/16/')
+    mock_get_soup.assert_called_once_with(
+        'https://tenki.jp/forecast/3/16/',
+        parse_only=parsing.parse_subprefectures_and_cities.parse_only
+    )
     assert output['東京23区']['13101'] == expected_value_1
     assert output['小笠原諸島(父島)']['13421'] == expected_value_2
 
@@ -91,5 +108,8 @@ def test_failed_to_extract_prefectures_and_cities(mocker, location_scraper):
         prefecture_id=16
     )
 
-    mock_get_soup.assert_called_once_with('https://tenki.jp/forecast/3/16/')
+    mock_get_soup.assert_called_once_with(
+        'https://tenki.jp/forecast/3/16/',
+        parse_only=parsing.parse_subprefectures_and_cities.parse_only
+    )
     assert output is None
@@ -0,0 +1,185 @@
+import json
+
+import requests
+
+from tenki_no_ko import ForecastCache
+from tenki_no_ko import LocationScraper
+from tenki_no_ko import Metrics
+from tenki_no_ko import WeatherScraper
+
+
+def test_metrics_count_phases_and_outcomes(fixture_server, location_ids):
+    events = []
+    metrics = Metrics(hooks=[events.append])
+    weather_scraper = WeatherScraper(
+        base_url=fixture_server.base_url,
+        metrics=metrics
+    )
+
+    weather_scraper.extract_forecast_summary(location_ids)
+    snapshot = metrics.snapshot()
+
+    assert sorted(snapshot['phases']) == [
+        'extract',
+        'parse',
+        'transfer',
+        'wait',
+    ]
+    assert snapshot['phases']['transfer']['bytes'] == len(
+        fixture_server.pages['/forecast/3/16/4410/13101/']
+    )
+    assert snapshot['extractors'] == {
+        'parse_forecast_summary': {
+            'success': 1,
+            'parse_miss': 0,
+            'network_error': 0,
+            'cache_hit': 0,
+        },
+    }
+    assert [event['event'] for event in events] == [
+        'phase',
+        'phase',
+        'phase',
+        'phase',
+        'outcome',
+    ]
+    assert events[-1]['url'] == (
+        fixture_server.base_url + '/forecast/3/16/4410/13101/'
+    )
+
+
+def test_metrics_tell_parse_misses_from_network_errors(
+        mocker,
+        fixture_server
+):
+    events = []
+    metrics = Metrics(hooks=[events.append])
+    location_scraper = LocationScraper(
+        base_url=fixture_server.base_url,
+        metrics=metrics
+    )
+
+    # The 404 page has none of the expected elements
+    assert location_scraper.extract_prefectures('99') is None
+
+    mocker.patch.object(
+        location_scraper.transport,
+        'get',
+        side_effect=requests.exceptions.ConnectionError
+    )
+    assert location_scraper.extract_regions() is None
+
+    assert metrics.snapshot()['extractors'] == {
+        'parse_prefectures': {
+            'success': 0,
+            'parse_miss': 1,
+            'network_error': 0,
+            'cache_hit': 0,
+        },
+        'parse_regions': {
+            'success': 0,
+            'parse_miss': 0,
+            'network_error': 1,
+            'cache_hit': 0,
+        },
+    }
+
+    errors = [event['error'] for event in events if 'error' in event]
+    assert isinstance(errors[0], requests.exceptions.HTTPError)
+    assert errors[0].response.status_code == 404
+    assert isinstance(errors[1], requests.exceptions.ConnectionError)
+
+
+def test_metrics_count_partly_read_pages_as_parse_misses(
+        fixture_server,
+        location_ids
+):
+    events = []
+    metrics = Metrics(hooks=[events.append])
+    weather_scraper = WeatherScraper(
+        base_url=fixture_server.base_url,
+        metrics=metrics
+    )
+
+    # Only the tomorrow section is missing
+    path = '/forecast/3/16/4410/13101/'
+    fixture_server.pages[path] = fixture_server.pages[path].replace(
+        b'tomorrow-weather',
+        b'tomorrow'
+    )
+    output = weather_scraper.extract_forecast_summary(location_ids)
+
+    assert output['forecasts']['today']['weather']
+    assert output['forecasts']['tomorrow']['weather'] == ''
+    assert metrics.snapshot()['extractors']['parse_forecast_summary'] == {
+        'success': 0,
+        'parse_miss': 1,
+        'network_error': 0,
+        'cache_hit': 0,
+    }
+    assert events[-1]['error'] is None
+
+
+def test_metrics_count_stream_engine_and_cache_hits(
+        fixture_server,
+        location_ids
+):
+    metrics = Metrics()
+    weather_scraper = WeatherScraper(
+        base_url=fixture_server.base_url,
+        engine='stream',
+        cache=ForecastCache(),
+        metrics=metrics
+    )
+
+    weather_scraper.extract_3_hourly_forecasts(location_ids)
+    weather_scraper.extract_3_hourly_forecasts(location_ids)
+    snapshot = metrics.snapshot()
+
+    assert sorted(snapshot['phases']) == ['stream']
+    assert snapshot['extractors']['parse_3_hourly_forecasts'] == {
+        'success': 1,
+        'parse_miss': 0,
+        'network_error': 0,
+        'cache_hit': 1,
+    }
+
+
+def test_metrics_exporters():
+    metrics = Metrics()
+    metrics.phase('parse', 'http://tenki.invalid/', 0.25, 1024)
+    metrics.phase('parse', 'http://tenki.invalid/', 0.5, 1024)
+    metrics.outcome('parse_regions', 'http://tenki.invalid/', 'success')
+
+    assert json.loads(metrics.to_json()) == {
+        'phases': {
+            'parse': {'count': 2, 'seconds': 0.75, 'bytes': 2048},
+        },
+        'extractors': {
+            'parse_regions': {
+                'success': 1,
+                'parse_miss': 0,
+                'network_error': 0,
+                'cache_hit': 0,
+            },
+        },
+    }
+
+    lines = metrics.to_prometheus().splitlines()
+    assert 'tenki_no_ko_phase_calls_total{phase="parse"} 2' in lines
+    assert 'tenki_no_ko_phase_seconds_total{phase="parse"} 0.75' in lines
+    assert 'tenki_no_ko_phase_bytes_total{phase="parse"} 2048' in lines
+    assert (
+        'tenki_no_ko_extractions_total'
+        '{extractor="parse_regions",outcome="success"} 1'
+    ) in lines
+
+    metrics.reset()
+    assert metrics.snapshot() == {'phases': {}, 'extractors': {}}
+
+
+def test_scraper_without_metrics(fixture_server, location_ids):
+    weather_scraper = WeatherScraper(base_url=fixture_server.base_url)
+
+    assert weather_scraper.metrics is None
+    assert weather_scraper.extract_forecast_summary(location_ids)['city']
@@ -0,0 +1,62 @@
+import pytest
+from bs4 import BeautifulSoup
+
+import conftest
+from tenki_no_ko import parsing
+
+PAGES = [
+    ('index.html', parsing.parse_regions),
+    ('prefecture.html', parsing.parse_prefectures),
+    ('subprefecture.html', parsing.parse_subprefectures_and_cities),
+    ('forecast_summary.html', parsing.parse_forecast_summary),
+    ('3_hourly_forecast.html', parsing.parse_3_hourly_forecasts),
+    ('index.html', parsing.parse_listing_forecasts),
+    ('subprefecture.html', parsing.parse_listing_forecasts),
+]
+
+
+@pytest.mark.parametrize('filename, parse', PAGES)
+def test_parser_backends_parity(filename, parse):
+    pytest.importorskip('lxml')
+
+    html = conftest.test_file(filename).encode('utf-8')
+    expected = parse(BeautifulSoup(html, 'html.parser'))
+
+    assert expected
+    assert parse(parsing.make_soup(html, 'lxml')) == expected
+
+
+@pytest.mark.parametrize('parser', ['html.parser', 'lxml'])
+@pytest.mark.parametrize('filename, parse', PAGES)
+def test_parse_only_parity(filename, parse, parser):
+    pytest.importorskip(parser.split('.')[0])
+
+    html = conftest.test_file(filename).encode('utf-8')
+    expected = parse(BeautifulSoup(html, parser))
+    soup = parsing.make_soup(html, parser, parse.parse_only)
+
+    assert parse(soup) == expected
+    assert len(soup.find_all(True)) < len(
+        BeautifulSoup(html, parser).find_all(True)
+    )
+
+
+def test_resolve_parser():
+    pytest.importorskip('lxml')
+
+    assert parsing.resolve_parser('lxml') == 'lxml'
+    assert parsing.resolve_parser('html.parser') == 'html.parser'
+
+
+def test_resolve_missing_parser(mocker):
+    mocker.patch.object(
+        target=parsing.builder_registry,
+        attribute='lookup',
+        return_value=None
+    )
+
+    assert parsing.resolve_parser('lxml') == 'html.parser'
+
+
+def test_parse_content_without_content():
+    assert parsing.parse_content(None, parsing.parse_regions) is None
@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+
+from tenki_no_ko import ForecastSummary
+from tenki_no_ko import ThreeHourlyForecasts
+from tenki_no_ko import parsing
+from tenki_no_ko.cache import JST
+
+NOW = datetime.datetime(2020, 8, 20, 9, 0, tzinfo=JST)
+
+
+def test_forecast_summary(forecast_summary_html):
+    output = parsing.parse_content(
+        forecast_summary_html,
+        parsing.parse_forecast_summary
+    )
+    record = ForecastSummary.from_dict(output, now=NOW)
+
+    assert record.city == '千代田区'
+    assert record.update_datetime == datetime.datetime(
+        2020, 8, 20, 6, 0, tzinfo=JST
+    )
+    assert record.today.date == datetime.date(2020, 8, 20)
+    assert record.today.high_temp == 35
+    assert record.today.high_tempdiff == 1
+    assert record.tomorrow.high_tempdiff == 0
+    assert record.tomorrow.low_temp == 25
+    assert record.tomorrow.low_tempdiff == -2
+    assert record.to_dict() == output
+
+
+def test_failed_forecast_summary():
+    output = parsing.parse_forecast_summary(None)
+    record = ForecastSummary.from_dict(output, now=NOW)
+
+    assert record.update_datetime is None
+    assert record.today.date is None
+    assert record.today.high_temp is None
+    assert record.to_dict() == output
+
+
+def test_forecast_summary_across_new_year():
+    output = parsing.parse_forecast_summary(None)
+    output['update_datetime'] = '31日17:00'
+    output['forecasts']['tomorrow']['date'] = '01月01日(金)'
+    record = ForecastSummary.from_dict(
+        output,
+        now=datetime.datetime(2020, 12, 31, 18, 0, tzinfo=JST)
+    )
+
+    assert record.tomorrow.date == datetime.date(2021, 1, 1)
+
+
+@pytest.mark.parametrize('extra_rows', [
+    (),
+    parsing.THREE_HOURLY_EXTRA_ROWS,
+])
+def test_three_hourly_forecasts(three_hourly_forecast_html, extra_rows):
+    output = parsing.parse_content(
+        three_hourly_forecast_html,
+        parsing.parse_3_hourly_forecasts,
+        extra_rows=extra_rows
+    )
+    record = ThreeHourlyForecasts.from_dict(output)
+
+    assert record.today[0].hour == 3
+    assert record.today[0].temp == 28.0
+    assert record.tomorrow[0].temp == 26.4
+    assert record.to_dict() == output
+
+    if extra_rows:
+        assert record.today[0].prob_precip is None
+        assert record.today[0].humidity == 90
+        assert record.today[0].wind_direction == '南'
+
+
+def test_failed_three_hourly_forecasts():
+    output = parsing.parse_3_hourly_forecasts(None, ['humidity'])
+    record = ThreeHourlyForecasts.from_dict(output)
+
+    assert record.today[-1].hour == 24
+    assert record.today[-1].humidity is None
+    assert record.to_dict() == output
@@ -1,6 +1,13 @@
+import concurrent.futures
+
+import pytest
 import requests
 from bs4 import BeautifulSoup
 
+from tenki_no_ko import LocationScraper
+from tenki_no_ko import Scraper
+from tenki_no_ko import WeatherScraper
+
 DUMMY_URL = 'http://localhost'
 
 
@@ -14,3 +21,43 @@ def test_failed_to_get_soup(requests_mock, scraper):
     requests_mock.get(DUMMY_URL, exc=requests.exceptions.HTTPError)
     soup = scraper.get_soup(DUMMY_URL)
     assert soup is None
+
+
+def test_get_soup_with_lxml(requests_mock, index_html):
+    pytest.importorskip('lxml')
+
+    requests_mock.get(DUMMY_URL, content=index_html)
+    soup = Scraper(parser='lxml').get_soup(DUMMY_URL)
+    assert soup == BeautifulSoup(index_html, 'lxml')
+
+
+def test_scrape_with_process_pool(mocker, fixture_server, location_ids):
+    location_scraper = LocationScraper(base_url=fixture_server.base_url)
+    weather_scraper = WeatherScraper(base_url=fixture_server.base_url)
+    expected = (
+        location_scraper.extract_subprefectures_and_cities('3', '16'),
+        weather_scraper.extract_3_hourly_forecasts(location_ids, ['humidity']),
+    )
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        location_scraper.executor = executor
+        weather_scraper = WeatherScraper(
+            base_url=fixture_server.base_url,
+            executor=executor
+        )
+        spy_get_soup = mocker.spy(weather_scraper, 'get_soup')
+        output = (
+            location_scraper.extract_subprefectures_and_cities('3', '16'),
+            weather_scraper.extract_3_hourly_forecasts(
+                location_ids,
+                ['humidity']
+            ),
+        )
+        batch = weather_scraper.extract_forecast_summary_batch(
+            [location_ids, dict(location_ids, city_id='99999')]
+        )
+
+    assert output == expected
+    assert spy_get_soup.call_count == 0
+    assert batch['13101']['forecast']['city'] == '千代田区'
+    assert batch['99999']['forecast']['city'] == ''
@@ -0,0 +1,84 @@
+import pytest
+
+from tenki_no_ko import CityIndex
+from tenki_no_ko import parsing
+from tenki_no_ko.search import normalize
+from tenki_no_ko.search import romanize
+
+CITIES = [
+    {'city_id': '13101', 'city_name': '千代田区', 'prefecture_name': '東京都'},
+    {'city_id': '13102', 'city_name': '中央区', 'prefecture_name': '東京都'},
+    {'city_id': '13206', 'city_name': '府中市', 'prefecture_name': '東京都'},
+    {'city_id': '34208', 'city_name': '府中市', 'prefecture_name': '広島県'},
+    {'city_id': '1100', 'city_name': '札幌市', 'prefecture_name': '北海道'},
+]
+READINGS = {
+    '13101': 'ちよだく',
+    '13102': 'ちゅうおうく',
+    '13206': 'ふちゅうし',
+    '34208': 'ふちゅうし',
+    '1100': 'サッポロシ',
+}
+
+
+@pytest.fixture
+def city_index():
+    return CityIndex(CITIES, readings=READINGS)
+
+
+def _city_ids(cities):
+    return [city['city_id'] for city in cities]
+
+
+def test_normalize():
+    assert normalize('ＣｈｉＹｏｄａ') == 'chiyoda'
+    assert normalize('チヨダ ｸ') == 'ちよだく'
+
+
+def test_romanize():
+    assert romanize('ちよだく') == 'chiyodaku'
+    assert romanize('ちゅうおうく') == 'chuoku'
+    assert romanize('サッポロ') == 'sapporo'
+    assert romanize('千代田') is None
+
+
+def test_complete(city_index):
+    assert _city_ids(city_index.complete('千代田')) == ['13101']
+    assert _city_ids(city_index.complete('ちよだ')) == ['13101']
+    assert _city_ids(city_index.complete('チヨダ')) == ['13101']
+    assert _city_ids(city_index.complete('Chiyoda')) == ['13101']
+    assert _city_ids(city_index.complete('さっぽろ')) == ['1100']
+    assert city_index.complete('') == []
+    assert city_index.complete('横浜') == []
+
+
+def test_complete_with_duplicate_names(city_index):
+    cities = city_index.complete('府中')
+
+    assert sorted(_city_ids(cities)) == ['13206', '34208']
+    assert sorted(city['prefecture_name'] for city in cities) == [
+        '広島県',
+        '東京都',
+    ]
+    assert len(city_index.complete('fuchu', limit=1)) == 1
+
+
+def test_search_with_typo(city_index):
+    assert _city_ids(city_index.search('chyoda')) == ['13101']
+    assert _city_ids(city_index.search('sappro')) == ['1100']
+    assert city_index.search('osaka') == []
+
+
+def test_index_from_listing(subprefecture_html):
+    output = parsing.parse_content(
+        subprefecture_html,
+        parsing.parse_subprefectures_and_cities
+    )
+    city_index = CityIndex(
+        {'city_id': city_id, 'city_name': city['city_name']}
+        for cities in output.values()
+        for city_id, city in cities.items()
+    )
+
+    assert _city_ids(city_index.search('千代田')) == ['13101']
+    assert len(city_index) == sum(len(cities) for cities in output.values())
@@ -0,0 +1,175 @@
+import time
+
+import pytest
+
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko import parsing
+from tenki_no_ko import streaming
+
+PAGES = [
+    ('forecast_summary', parsing.parse_forecast_summary),
+    ('three_hourly_forecast', parsing.parse_3_hourly_forecasts),
+    ('forecast_summary', parsing.parse_forecast_header),
+    ('three_hourly_forecast', parsing.parse_forecast_header),
+]
+
+
+@pytest.fixture
+def pages(forecast_summary_html, three_hourly_forecast_html):
+    return {
+        'forecast_summary': forecast_summary_html,
+        'three_hourly_forecast': three_hourly_forecast_html,
+    }
+
+
+@pytest.mark.parametrize('page, parse', PAGES)
+def test_stream_parser_parity(pages, page, parse):
+    stream_parser = streaming.STREAM_PARSERS[parse]()
+    stream_parser.feed_bytes(pages[page])
+    stream_parser.close()
+
+    assert stream_parser.result() == parsing.parse_content(pages[page], parse)
+
+
+@pytest.mark.parametrize('page, parse', PAGES)
+def test_stream_parser_stops_early(pages, page, parse):
+    content = pages[page]
+    stream_parser = streaming.STREAM_PARSERS[parse]()
+
+    for offset in range(0, len(content), 1024):
+        if stream_parser.feed_bytes(content[offset:offset + 1024]):
+            break
+
+    assert stream_parser.done
+    assert offset + 1024 < len(content) // 2
+    assert stream_parser.result() == parsing.parse_content(content, parse)
+
+
+@pytest.mark.parametrize('page, parse', PAGES)
+def test_stream_parser_with_small_chunks(pages, page, parse):
+    # Chunk boundaries fall inside tags, text nodes and multibyte
+    # characters.
+    content = pages[page]
+    stream_parser = streaming.STREAM_PARSERS[parse]()
+
+    for offset in range(0, len(content), 7):
+        if stream_parser.feed_bytes(content[offset:offset + 7]):
+            break
+
+    assert stream_parser.result() == parsing.parse_content(content, parse)
+
+
+def test_stream_parser_with_extra_rows(three_hourly_forecast_html):
+    extra_rows = parsing.THREE_HOURLY_EXTRA_ROWS
+    stream_parser = streaming.ThreeHourlyForecastParser(extra_rows)
+    stream_parser.feed_bytes(three_hourly_forecast_html)
+
+    assert stream_parser.done
+    assert stream_parser.result() == parsing.parse_content(
+        three_hourly_forecast_html,
+        parsing.parse_3_hourly_forecasts,
+        extra_rows=extra_rows
+    )
+
+
+def test_stream_parser_with_missing_marker(forecast_summary_html):
+    content = forecast_summary_html.replace(
+        b'tomorrow-weather',
+        b'tomorrow-other'
+    )
+    stream_parser = streaming.ForecastSummaryParser()
+    stream_parser.feed_bytes(content)
+    stream_parser.close()
+
+    assert stream_parser.result() is None
+    assert streaming.parse_content(
+        content,
+        parsing.parse_forecast_summary
+    ) == parsing.parse_content(content, parsing.parse_forecast_summary)
+
+
+def test_parse_content_without_content():
+    assert streaming.parse_content(
+        None,
+        parsing.parse_3_hourly_forecasts
+    ) == parsing.parse_3_hourly_forecasts(None)
+
+
+def test_weather_scraper_with_stream_engine(
+        requests_mock,
+        forecast_summary_html,
+        three_hourly_forecast_html,
+        location_ids
+):
+    url = 'https://tenki.jp/forecast/3/16/4410/13101/'
+    requests_mock.get(url, content=forecast_summary_html)
+    requests_mock.get(url + '3hours.html', content=three_hourly_forecast_html)
+
+    weather_scraper = WeatherScraper(engine='stream')
+
+    assert weather_scraper.extract_forecast_summary(
+        location_ids
+    ) == WeatherScraper().extract_forecast_summary(location_ids)
+    assert weather_scraper.extract_3_hourly_forecasts(
+        location_ids
+    ) == WeatherScraper().extract_3_hourly_forecasts(location_ids)
+
+
+def test_weather_scraper_with_unknown_engine():
+    with pytest.raises(ValueError):
+        WeatherScraper(engine='regex')
+
+
+@pytest.mark.parametrize('page, parse', PAGES)
+def test_parse_chunks_parity(pages, page, parse):
+    content = pages[page]
+    chunks = [
+        content[offset:offset + 4096]
+        for offset in range(0, len(content), 4096)
+    ]
+
+    assert streaming.parse_chunks(
+        chunks,
+        parse
+    ) == parsing.parse_content(content, parse)
+
+
+def test_parse_chunks_reads_rest_on_missing_marker(forecast_summary_html):
+    content = forecast_summary_html.replace(b'weather-telop', b'telop')
+    chunks = iter([
+        content[offset:offset + 4096]
+        for offset in range(0, len(content), 4096)
+    ])
+    output = streaming.parse_chunks(chunks, parsing.parse_forecast_summary)
+
+    assert list(chunks) == []
+    assert output == parsing.parse_content(
+        content,
+        parsing.parse_forecast_summary
+    )
+
+
+def test_stream_engine_stops_download_early(fixture_server, location_ids):
+    fixture_server.chunk_size = 4096
+    fixture_server.delay = 0.005
+    weather_scraper = WeatherScraper(
+        base_url=fixture_server.base_url,
+        engine='stream'
+    )
+    output = weather_scraper.extract_forecast_summary(location_ids)
+
+    path = '/forecast/3/16/4410/13101/'
+    content = fixture_server.pages[path]
+
+    # Give the server a moment to notice the closed connection
+    for _ in range(100):
+        sent = fixture_server.sent[path]
+        time.sleep(0.01)
+        if sent == fixture_server.sent[path]:
+            break
+
+    assert output == parsing.parse_content(
+        content,
+        parsing.parse_forecast_summary
+    )
+    assert fixture_server.sent[path] < len(content) * 3 // 4
@@ -0,0 +1,39 @@
+from tenki_no_ko import LocationScraper
+from tenki_no_ko import Transport
+from tenki_no_ko import WeatherScraper
+
+DUMMY_URL = 'http://localhost'
+
+
+def test_get_with_default_timeout(requests_mock):
+    requests_mock.get(DUMMY_URL, content=b'')
+    transport = Transport(connect_timeout=1, read_timeout=5)
+    transport.get(DUMMY_URL)
+
+    assert requests_mock.last_request.timeout == (1, 5)
+
+
+def test_get_with_overridden_timeout(requests_mock):
+    requests_mock.get(DUMMY_URL, content=b'')
+    transport = Transport()
+    transport.get(DUMMY_URL, timeout=30)
+
+    assert requests_mock.last_request.timeout == 30
+
+
+def test_mounted_adapter():
+    transport = Transport(pool_maxsize=32, retries=5, backoff_factor=1)
+    adapter = transport.session.get_adapter('https://tenki.jp')
+
+    assert adapter._pool_maxsize == 32
+    assert adapter.max_retries.total == 5
+    assert adapter.max_retries.backoff_factor == 1
+    assert 503 in adapter.max_retries.status_forcelist
+
+
+def test_scrapers_share_transport():
+    transport = Transport()
+    location_scraper = LocationScraper(transport=transport)
+    weather_scraper = WeatherScraper(transport=transport)
+
+    assert location_scraper.transport is weather_scraper.transport
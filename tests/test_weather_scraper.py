@@ -1,5 +1,14 @@
+import threading
+
+import pytest
+import requests
 from bs4 import BeautifulSoup
 
+import conftest
+from tenki_no_ko import Transport
+from tenki_no_ko import WeatherScraper
+from tenki_no_ko import parsing
+
 
 def test_extract_forecast_summary(
         mocker,
@@ -15,7 +24,8 @@ def test_extract_forecast_summary(
     output = weather_scraper.extract_forecast_summary(location_ids)
 
     mock_get_soup.assert_called_once_with(
-        'https://tenki.jp/forecast/3/16/4410/13101/'
+        'https://tenki.jp/forecast/3/16/4410/13101/',
+        parse_only=parsing.parse_forecast_summary.parse_only
     )
     assert output == {
         'city': '千代田区',
@@ -55,7 +65,8 @@ def test_failed_to_extract_forecast_summary(
     output = weather_scraper.extract_forecast_summary(location_ids)
 
     mock_get_soup.assert_called_once_with(
-        'https://tenki.jp/forecast/3/16/4410/13101/'
+        'https://tenki.jp/forecast/3/16/4410/13101/',
+        parse_only=parsing.parse_forecast_summary.parse_only
     )
     assert output == {
         'city': '',
@@ -136,7 +147,8 @@ def test_extract_3_hourly_forecasts(
     output = weather_scraper.extract_3_hourly_forecasts(location_ids)
 
     mock_get_soup.assert_called_once_with(
-        'https://tenki.jp/forecast/3/16/4410/13101/3hours.html'
+        'https://tenki.jp/forecast/3/16/4410/13101/3hours.html',
+        parse_only=parsing.parse_3_hourly_forecasts.parse_only
     )
     assert output == {
         'today': [
@@ -150,18 +162,63 @@ def test_extract_3_hourly_forecasts(
             {'hour': '24', 'weather': '晴れ', 'temp': '27.3'},
         ],
         'tomorrow': [
-            {'hour': '03', 'weather': '晴れ', 'temp': '28.0'},
-            {'hour': '06', 'weather': '晴れ', 'temp': '28.0'},
-            {'hour': '09', 'weather': '晴れ', 'temp': '31.5'},
-            {'hour': '12', 'weather': '晴れ', 'temp': '34.7'},
+            {'hour': '03', 'weather': '晴れ', 'temp': '26.4'},
+            {'hour': '06', 'weather': '晴れ', 'temp': '25.8'},
+            {'hour': '09', 'weather': '晴れ', 'temp': '30.7'},
+            {'hour': '12', 'weather': '晴れ', 'temp': '33.9'},
             {'hour': '15', 'weather': '晴れ', 'temp': '34.8'},
-            {'hour': '18', 'weather': '晴れ', 'temp': '30.6'},
-            {'hour': '21', 'weather': '晴れ', 'temp': '28.1'},
-            {'hour': '24', 'weather': '晴れ', 'temp': '27.3'},
+            {'hour': '18', 'weather': '晴れ', 'temp': '30.9'},
+            {'hour': '21', 'weather': '晴れ', 'temp': '28.6'},
+            {'hour': '24', 'weather': '晴れ', 'temp': '27.8'},
         ]
     }
 
 
+def test_extract_3_hourly_forecasts_with_extra_rows(
+    mocker,
+    three_hourly_forecast_html,
+    location_ids,
+    weather_scraper
+):
+    mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        return_value=BeautifulSoup(three_hourly_forecast_html, 'html.parser')
+    )
+    output = weather_scraper.extract_3_hourly_forecasts(
+        location_ids,
+        extra_rows=('prob_precip', 'humidity', 'wind_direction')
+    )
+
+    assert output['today'][0] == {
+        'hour': '03',
+        'weather': '晴れ',
+        'temp': '28.0',
+        'prob_precip': '---',
+        'humidity': '90',
+        'wind_direction': '南',
+    }
+    assert output['tomorrow'][7] == {
+        'hour': '24',
+        'weather': '晴れ',
+        'temp': '27.8',
+        'prob_precip': '10',
+        'humidity': '90',
+        'wind_direction': '南南東',
+    }
+
+
+def test_extract_3_hourly_forecasts_with_unknown_extra_rows(
+    location_ids,
+    weather_scraper
+):
+    with pytest.raises(ValueError):
+        weather_scraper.extract_3_hourly_forecasts(
+            location_ids,
+            extra_rows=('pollen',)
+        )
+
+
 def test_failed_to_extract_3_hourly_forecasts(
     mocker,
     weather_scraper
@@ -180,7 +237,8 @@ def test_failed_to_extract_3_hourly_forecasts(
     output = weather_scraper.extract_3_hourly_forecasts(location_ids)
 
     mock_get_soup.assert_called_once_with(
-        'https://tenki.jp/forecast/3/16/4410/13101/3hours.html'
+        'https://tenki.jp/forecast/3/16/4410/13101/3hours.html',
+        parse_only=parsing.parse_3_hourly_forecasts.parse_only
     )
     assert output == {
         'today': [
@@ -264,7 +322,8 @@ def test_extract_3_hourly_forecasts_for_next_24_hours(
     )
 
     mock_get_soup.assert_called_once_with(
-        'https://tenki.jp/forecast/3/16/4410/13101/3hours.html'
+        'https://tenki.jp/forecast/3/16/4410/13101/3hours.html',
+        parse_only=parsing.parse_3_hourly_forecasts.parse_only
     )
     assert output == [
         {'hour': '12', 'weather': '晴れ', 'temp': '34.7'},
@@ -272,7 +331,290 @@ def test_extract_3_hourly_forecasts_for_next_24_hours(
         {'hour': '18', 'weather': '晴れ', 'temp': '30.6'},
         {'hour': '21', 'weather': '晴れ', 'temp': '28.1'},
         {'hour': '24', 'weather': '晴れ', 'temp': '27.3'},
-        {'hour': '03', 'weather': '晴れ', 'temp': '28.0'},
-        {'hour': '06', 'weather': '晴れ', 'temp': '28.0'},
-        {'hour': '09', 'weather': '晴れ', 'temp': '31.5'},
+        {'hour': '03', 'weather': '晴れ', 'temp': '26.4'},
+        {'hour': '06', 'weather': '晴れ', 'temp': '25.8'},
+        {'hour': '09', 'weather': '晴れ', 'temp': '30.7'},
+    ]
+
+
+def test_extract_forecast_summary_batch(
+        mocker,
+        forecast_summary_html,
+        location_ids,
+        weather_scraper
+):
+    mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        side_effect=lambda url, parse_only: BeautifulSoup(
+            forecast_summary_html,
+            'html.parser'
+        )
+    )
+    other_location_ids = dict(location_ids, city_id='13102')
+    output = weather_scraper.extract_forecast_summary_batch(
+        [location_ids, other_location_ids],
+        max_workers=2
+    )
+
+    assert sorted(output) == ['13101', '13102']
+    assert output['13101']['location_ids'] == location_ids
+    assert output['13101']['forecast']['city'] == '千代田区'
+    assert output['13101']['error'] is None
+    assert output['13102']['location_ids'] == other_location_ids
+
+
+def test_extract_3_hourly_forecasts_batch_with_failed_location(
+        mocker,
+        location_ids,
+        weather_scraper
+):
+    def _extract_3_hourly_forecasts(location_ids):
+        if location_ids['city_id'] == '13102':
+            raise ValueError('boom')
+        return {'today': [], 'tomorrow': []}
+
+    mocker.patch.object(
+        target=weather_scraper,
+        attribute='extract_3_hourly_forecasts',
+        side_effect=_extract_3_hourly_forecasts
+    )
+    output = weather_scraper.extract_3_hourly_forecasts_batch(
+        [location_ids, dict(location_ids, city_id='13102')]
+    )
+
+    assert output['13101']['forecast'] == {'today': [], 'tomorrow': []}
+    assert output['13101']['error'] is None
+    assert output['13102']['forecast'] is None
+    assert isinstance(output['13102']['error'], ValueError)
+
+
+def test_extract_forecast_summary_batch_with_fetch_failures(
+        fixture_server,
+        location_ids
+):
+    fixture_server.throttle = 1
+    fixture_server.throttle_status = 503
+    weather_scraper = WeatherScraper(
+        transport=Transport(retries=0),
+        base_url=fixture_server.base_url
+    )
+    output = weather_scraper.extract_forecast_summary_batch(
+        [location_ids],
+        max_workers=1
+    )
+
+    assert output['13101']['forecast'] is None
+    assert isinstance(
+        output['13101']['error'],
+        requests.exceptions.RequestException
+    )
+
+    # Refused connections
+    weather_scraper = WeatherScraper(
+        transport=Transport(retries=0),
+        base_url='http://127.0.0.1:9'
+    )
+    records = list(weather_scraper.iter_3_hourly_forecasts([location_ids]))
+
+    assert records[0]['forecast'] is None
+    assert isinstance(
+        records[0]['error'],
+        requests.exceptions.ConnectionError
+    )
+
+    # The single extractors still fall back to empty results
+    assert weather_scraper.extract_forecast_summary(
+        location_ids
+    ) == parsing.parse_forecast_summary(None)
+
+
+def test_extract_city_snapshot(fixture_server, location_ids):
+    fixture_server.latency = 0.3
+    weather_scraper = WeatherScraper(base_url=fixture_server.base_url)
+
+    output = weather_scraper.extract_city_snapshot(location_ids)
+
+    assert sorted(fixture_server.requests) == [
+        '/forecast/3/16/4410/13101/',
+        '/forecast/3/16/4410/13101/3hours.html',
+    ]
+    # Both pages were being served at the same time
+    assert fixture_server.max_active == 2
+    assert output['city'] == '千代田区'
+    assert output['forecasts']['tomorrow']['date'] == '08月21日(金)'
+    assert output['3_hourly_forecasts']['tomorrow'][0] == {
+        'hour': '03',
+        'weather': '晴れ',
+        'temp': '26.4',
+    }
+
+
+def test_extract_city_snapshot_reuses_threads(fixture_server, location_ids):
+    def _snapshot_threads():
+        return {
+            thread
+            for thread in threading.enumerate()
+            if thread.name.startswith('tenki-snapshot')
+        }
+
+    weather_scraper = WeatherScraper(base_url=fixture_server.base_url)
+    threads = _snapshot_threads()
+
+    for _ in range(5):
+        weather_scraper.extract_city_snapshot(location_ids)
+
+    # The snapshots ran one after the other, so one thread served all
+    assert len(_snapshot_threads() - threads) == 1
+
+
+def test_extract_city_snapshot_with_unknown_location_ids(
+        mocker,
+        weather_scraper
+):
+    mock_get_soup = mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+    )
+    output = weather_scraper.extract_city_snapshot(location_ids=None)
+
+    assert mock_get_soup.call_count == 0
+    assert output['city'] == ''
+    assert output['3_hourly_forecasts']['today'][0] == {
+        'hour': '03',
+        'weather': '',
+        'temp': '',
+    }
+
+
+@pytest.mark.parametrize('kwargs, url, filename, count', [
+    ({}, 'https://tenki.jp', 'index.html', 13),
+    (
+        {'region_id': '3'},
+        'https://tenki.jp/forecast/3/',
+        'prefecture.html',
+        9
+    ),
+    (
+        {'region_id': '3', 'prefecture_id': '16'},
+        'https://tenki.jp/forecast/3/16/',
+        'subprefecture.html',
+        21
+    ),
+])
+def test_extract_listing_forecasts(
+        mocker,
+        weather_scraper,
+        kwargs,
+        url,
+        filename,
+        count
+):
+    mock_get_soup = mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        return_value=BeautifulSoup(conftest.test_file(filename), 'html.parser')
+    )
+    output = weather_scraper.extract_listing_forecasts(**kwargs)
+
+    mock_get_soup.assert_called_once_with(
+        url,
+        parse_only=parsing.parse_listing_forecasts.parse_only
+    )
+    assert len(output['forecasts']) == count
+    assert output['forecasts']['13101']['temps']['high'].isdigit()
+
+
+def test_extract_listing_forecasts_from_prefecture_page(
+        mocker,
+        subprefecture_html,
+        location_ids,
+        weather_scraper
+):
+    mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        return_value=BeautifulSoup(subprefecture_html, 'html.parser')
+    )
+    output = weather_scraper.extract_listing_forecasts('3', '16')
+
+    assert output['update_datetime'] == '19日22:00'
+    assert output['forecasts']['13101'] == {
+        'location_ids': location_ids,
+        'city': '千代田区',
+        'weather': '晴',
+        'temps': {
+            'high': '35',
+            'low': '26',
+        },
+        'prob_precip': '0%',
+    }
+    assert output['forecasts']['13113']['city'] == '渋谷区'
+
+
+def test_failed_to_extract_listing_forecasts(mocker, weather_scraper):
+    mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        return_value=None
+    )
+
+    assert weather_scraper.extract_listing_forecasts() == {
+        'update_datetime': '',
+        'forecasts': {},
+    }
+
+
+def test_iter_forecast_summaries(
+        mocker,
+        forecast_summary_html,
+        location_ids,
+        weather_scraper
+):
+    mocker.patch.object(
+        target=weather_scraper,
+        attribute='get_soup',
+        side_effect=lambda url, parse_only: BeautifulSoup(
+            forecast_summary_html,
+            'html.parser'
+        )
+    )
+    locations = (
+        dict(location_ids, city_id=str(13101 + index))
+        for index in range(10)
+    )
+    records = weather_scraper.iter_forecast_summaries(
+        locations,
+        max_workers=4,
+        ordered=True
+    )
+
+    assert [record['location_ids']['city_id'] for record in records] == [
+        str(13101 + index) for index in range(10)
     ]
+
+
+def test_iter_3_hourly_forecasts_with_failed_location(
+        mocker,
+        location_ids,
+        weather_scraper
+):
+    def _extract_3_hourly_forecasts(location_ids):
+        if location_ids['city_id'] == '13102':
+            raise ValueError('boom')
+        return {'today': [], 'tomorrow': []}
+
+    mocker.patch.object(
+        target=weather_scraper,
+        attribute='extract_3_hourly_forecasts',
+        side_effect=_extract_3_hourly_forecasts
+    )
+    records = {
+        record['location_ids']['city_id']: record
+        for record in weather_scraper.iter_3_hourly_forecasts(
+            [location_ids, dict(location_ids, city_id='13102')]
+        )
+    }
+
+    assert records['13101']['error'] is None
+    assert isinstance(records['13102']['error'], ValueError)